@@ -1,4 +1,5 @@
 from .user import router as user_router
 from .task import router as task_router
+from .metrics import router as metrics_router
 
-__all__ = "user_router, task_router,"
+__all__ = "user_router, task_router, metrics_router,"
@@ -0,0 +1,79 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from backend.cache import cache_stats
+from backend.metrics import (
+    METRICS_TOKEN,
+    render_metric,
+    render_pool_metrics,
+    render_request_metrics,
+)
+from backend.scheduler import scheduler
+from backend.security import password_pool_stats
+from backend.sqlstats import SLOW_QUERY_MS, query_totals
+from backend.writer import write_queue
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _check_token(request: Request):
+    if METRICS_TOKEN is None:
+        return
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+
+def _process_metrics() -> list[str]:
+    lines = []
+    lines += render_metric(
+        "db_write_queue_depth", "gauge", "Writes waiting for the writer task.",
+        [((), (), write_queue.depth())],
+    )
+    lines += render_metric(
+        "db_write_batches_total", "counter", "Transactions committed by the writer task.",
+        [((), (), write_queue.batches)],
+    )
+    lines += render_metric(
+        "db_writes_total", "counter", "Write operations applied by the writer task.",
+        [((), (), write_queue.writes)],
+    )
+    lines += render_metric(
+        "db_queries_total", "counter", "SQL statements executed by this worker.",
+        [((), (), query_totals["queries"])],
+    )
+    lines += render_metric(
+        "db_slow_queries_total", "counter", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g} ms).",
+        [((), (), query_totals["slow"])],
+    )
+    lines += render_metric(
+        "password_pool_pending", "gauge", "Password hashes queued or running.",
+        [((), (), password_pool_stats()["pending"])],
+    )
+
+    caches = {name: stats for name, stats in cache_stats().items() if "hits" in stats}
+    for field, kind in (("size", "gauge"), ("hits", "counter"), ("misses", "counter"),
+                        ("evictions", "counter")):
+        name = f"cache_{field}" + ("_total" if kind == "counter" else "")
+        lines += render_metric(
+            name, kind, f"In-process cache {field}.",
+            ((("cache",), (cache,), stats[field]) for cache, stats in caches.items()),
+        )
+
+    jobs = scheduler.stats()
+    for field in ("runs", "failures"):
+        lines += render_metric(
+            f"maintenance_job_{field}_total", "counter", f"Maintenance job {field}.",
+            ((("job",), (job,), stats[field]) for job, stats in jobs.items()),
+        )
+    return lines
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Per worker: with several workers each scrape sees the one that answered.
+    _check_token(request)
+    lines = render_request_metrics() + render_pool_metrics() + _process_metrics()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
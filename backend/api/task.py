@@ -1,19 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.models import User
 from backend.repositories import TaskRepository
-from backend.schemas import TaskCreate, TaskUpdate, TaskResponse
-from backend.db import get_session
-from backend.dependices import get_current_user
+from backend.repositories.task import search_terms
+from backend.schemas import (
+    TaskCreate,
+    TaskImportResult,
+    TaskUpdate,
+    TaskResponse,
+    TaskPage,
+    TaskChanges,
+    TaskSearchPage,
+    TaskSummary,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkDelete,
+    TaskBulkResponse,
+)
+from backend.pagination import encode_cursor, decode_cursor
+from backend.encoding import json_bytes, choose_encoding, compress
+from backend.cache import task_list_cache
+from backend.db import get_session, new_session
+from backend.metrics import timed
+from backend.transfer import (
+    MEDIA_TYPES,
+    MAX_IMPORT_LINE,
+    MAX_REPORTED_ERRORS,
+    ImportLineTooLong,
+    csv_header,
+    export_chunk,
+    parse_import,
+)
+from backend.dependices import Principal, get_current_principal
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Errors meaning tasks_fts was never created: SQLite was built without FTS5.
+SEARCH_UNAVAILABLE_ERRORS = ("no such table: tasks_fts", "no such module: fts5")
+# Rows per import transaction; other writes interleave between chunks.
+IMPORT_CHUNK_SIZE = 250
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
 
 @router.post("/", response_model=TaskResponse)
 async def create_task(
     task_data: TaskCreate,
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     task = await TaskRepository.create_task(
         session, user_id=user.id_user, title=task_data.title, description=task_data.description
@@ -21,32 +68,223 @@ async def create_task(
     return task
 
 
-@router.get("/", response_model=list[TaskResponse])
+@router.get("/", response_model=TaskPage)
 async def list_tasks(
+    request: Request,
     is_done: bool | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    after = decode_cursor(cursor, datetime, int) if cursor else None
+    version = await TaskRepository.get_tasks_version(session, user.id_user)
+    variant = hashlib.sha1(f"{user.id_user}|{is_done}|{limit}|{cursor}".encode()).hexdigest()[:16]
+    headers = {
+        "ETag": f'W/"{version}-{variant}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding, Authorization",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    cache_key = (user.id_user, is_done, limit, cursor)
+    bodies = task_list_cache.lookup(cache_key, version)
+    if bodies is None:
+        rows = await TaskRepository.get_user_task_rows(
+            session, user_id=user.id_user, is_done=is_done, limit=limit + 1, after=after
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        # Rows already match TaskResponse, so skip model validation and encode directly.
+        with timed("serialize"):
+            items = [row._asdict() for row in rows]
+            bodies = {None: json_bytes({"items": items, "next_cursor": next_cursor})}
+        task_list_cache.store(cache_key, version, bodies)
+
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(bodies[None]))
+    if encoding not in bodies:
+        with timed("compress"):
+            bodies = {**bodies, encoding: compress(bodies[None], encoding)}
+        task_list_cache.store(cache_key, version, bodies)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=bodies[encoding], media_type="application/json", headers=headers)
+
+
+@router.get("/summary", response_model=TaskSummary)
+async def get_task_summary(
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    active, done = await TaskRepository.get_task_summary(session, user.id_user)
+    return {"active": active, "done": done, "total": active + done}
+
+
+@router.get("/export")
+async def export_tasks(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    user: Principal = Depends(get_current_principal),
+):
+    async def body():
+        if fmt == "csv":
+            yield csv_header()
+        # Own session: the request's one is closed before the body is streamed.
+        async with new_session() as session:
+            async for rows in TaskRepository.stream_user_tasks(session, user.id_user):
+                yield export_chunk(rows, fmt)
+
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{fmt}"'}
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    # Accepts the export format back. Chunks are committed as they fill up,
+    # so a failed upload keeps the tasks imported before the failure.
+    imported = failed = 0
+    errors, chunk = [], []
+    try:
+        async for line, item in parse_import(request.stream(), fmt):
+            if isinstance(item, str):
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "detail": item})
+                continue
+            chunk.append(item.dict())
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                imported += await TaskRepository.import_tasks(session, user.id_user, chunk)
+                chunk = []
+    except ImportLineTooLong:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Line longer than {MAX_IMPORT_LINE} bytes, {imported} tasks imported",
+        )
+    if chunk:
+        imported += await TaskRepository.import_tasks(session, user.id_user, chunk)
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def list_task_changes(
+    since: int = Query(0, ge=0),
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    tasks = await TaskRepository.get_user_tasks(session, user_id=user.id_user, is_done=is_done)
-    return tasks
+    # Pass the returned revision as `since` next time. Apply `deleted` before
+    # `changed`: ids can be reused, and a live task is always newer than any
+    # tombstone with the same id. since=0 returns every task, and so does a
+    # `since` older than the tombstone retention window, with full_resync set:
+    # the client then replaces its copy instead of merging into it.
+    revision, changed, deleted, full_resync = await TaskRepository.get_changes(
+        session, user.id_user, since
+    )
+    return {"revision": revision, "changed": changed, "deleted": deleted, "full_resync": full_resync}
+
+
+@router.get("/search", response_model=TaskSearchPage)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    try:
+        rows = await TaskRepository.search_tasks(
+            session, user.id_user, terms, limit=limit + 1, offset=offset
+        )
+    except OperationalError as exc:
+        if not any(error in str(exc.orig) for error in SEARCH_UNAVAILABLE_ERRORS):
+            raise
+        raise HTTPException(status_code=501, detail="Search is not available")
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+    return {"items": [row._asdict() for row in rows], "next_offset": next_offset}
 
 
-@router.put("/{task_id}/", response_model=None)
+@router.put("/{task_id}/", response_model=TaskResponse)
 async def update_task(
     task_id: int,
     task_data: TaskUpdate,
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    await TaskRepository.update_task(session, task_id, user.id_user, data=task_data.dict(exclude_unset=True))
-    return {"message": "Task updated"}
+    task = await TaskRepository.update_task(
+        session, task_id, user.id_user, data=task_data.dict(exclude_unset=True)
+    )
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
 
 
 @router.delete("/{task_id}/", response_model=None)
 async def delete_task(
     task_id: int,
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    await TaskRepository.delete_task(session, task_id, user.id_user)
+    if not await TaskRepository.delete_task(session, task_id, user.id_user):
+        raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted"}
+
+
+@router.post("/bulk", response_model=TaskBulkResponse)
+async def create_tasks_bulk(
+    task_data: TaskBulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    tasks = await TaskRepository.create_tasks(
+        session, user_id=user.id_user, items=[item.dict() for item in task_data.items]
+    )
+    return {"results": [{"id": task.id, "status": "created", "task": task} for task in tasks]}
+
+
+@router.patch("/bulk", response_model=TaskBulkResponse)
+async def update_tasks_bulk(
+    task_data: TaskBulkUpdate,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    ids = [item.id for item in task_data.items]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate task ids")
+    updated = await TaskRepository.update_tasks(
+        session, user_id=user.id_user, items=[item.dict(exclude_unset=True) for item in task_data.items]
+    )
+    return {
+        "results": [
+            {"id": task_id, "status": "updated", "task": updated[task_id]}
+            if task_id in updated
+            else {"id": task_id, "status": "not_found"}
+            for task_id in ids
+        ]
+    }
+
+
+@router.delete("/bulk", response_model=TaskBulkResponse)
+async def delete_tasks_bulk(
+    task_data: TaskBulkDelete,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    deleted = await TaskRepository.delete_tasks(session, user_id=user.id_user, ids=task_data.ids)
+    return {
+        "results": [
+            {"id": task_id, "status": "deleted" if task_id in deleted else "not_found"}
+            for task_id in task_data.ids
+        ]
+    }
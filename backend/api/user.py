@@ -1,22 +1,37 @@
 # backend/api/auth.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from backend.models import User
-from backend.repositories import UserRepository, RevokedTokenRepository
-from backend.db import get_session
-from backend.schemas import UserCreate, UserLogin, Token, UserResponse, UserProfile
+from backend.repositories import UserRepository, RevokedTokenRepository, TaskRepository
+from backend.db import get_session, new_session
+from backend.schemas import UserCreate, UserLogin, Token, UserResponse, UserPage, UserProfile
+from backend.pagination import encode_cursor, decode_cursor
+from backend.encoding import json_bytes
 from backend.security import (
-    hash_password,
-    verify_password,
+    verify_password_async,
     create_access_token,
+    access_token_claims,
     oauth2_scheme,
     decode_token,
+    token_id,
 )
-from backend.dependices import get_current_user
+from backend.dependices import Principal, get_current_principal
+from backend.cache import cache_stats, invalidate_token
+from backend.scheduler import scheduler
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+DEFAULT_USERS_PAGE_SIZE = 100
+MAX_USERS_PAGE_SIZE = 1000
+
+
+async def _user_lines(**filters):
+    # Own session: the request's one is closed before the body is streamed.
+    async with new_session() as session:
+        async for rows in UserRepository.stream_users(session, **filters):
+            yield b"".join(json_bytes(row._asdict()) + b"\n" for row in rows)
+
 
 @router.post("/register/", response_model=UserResponse)
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_session)):
@@ -33,24 +48,86 @@ async def register(user_data: UserCreate, session: AsyncSession = Depends(get_se
 @router.post("/login/", response_model=Token)
 async def login(user_data: UserLogin, session: AsyncSession = Depends(get_session)):
     user = await UserRepository.get_user_by_email(session, user_data.email)
-    if not user or not verify_password(user_data.password, user.password_hash):
+    if not user or not await verify_password_async(user_data.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
-    token = create_access_token({"sub": user.email})
+    token = create_access_token(access_token_claims(user))
     return {"access_token": token, "token_type": "bearer"}
 
 
-@router.get("/users/", response_model=list[UserResponse])
+@router.get("/users/", response_model=UserPage)
 async def get_users(
-    session: AsyncSession = Depends(get_session), user: User = Depends(get_current_user)
+    limit: int = Query(DEFAULT_USERS_PAGE_SIZE, ge=1, le=MAX_USERS_PAGE_SIZE),
+    cursor: str | None = None,
+    email_prefix: str | None = Query(None, min_length=1, max_length=255),
+    with_task_counts: bool = False,
+    stream: bool = False,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    after = decode_cursor(cursor, str)[0] if cursor else None
+    filters = {"after": after, "email_prefix": email_prefix, "with_task_counts": with_task_counts}
+    if stream:
+        # Every matching user as NDJSON, one object per line; limit is ignored.
+        return StreamingResponse(_user_lines(**filters), media_type="application/x-ndjson")
+
+    rows = await UserRepository.get_users(session, limit=limit + 1, **filters)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].email)
+    return {"items": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+
+@router.post("/users/{user_id}/revoke-tokens/")
+async def revoke_user_tokens(
+    user_id: int,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
+):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if not await UserRepository.bump_token_version(session, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "All tokens of the user have been revoked"}
+
+
+@router.get("/cache-stats/")
+async def get_cache_stats(user: Principal = Depends(get_current_principal)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return cache_stats()
+
+
+@router.get("/maintenance/")
+async def get_maintenance_stats(user: Principal = Depends(get_current_principal)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return scheduler.stats()
+
+
+@router.post("/task-counters/check/")
+async def check_task_counters(
+    repair: bool = False,
+    session: AsyncSession = Depends(get_session),
+    user: Principal = Depends(get_current_principal),
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return await UserRepository.get_all_users(session)
+    drifted = await TaskRepository.check_task_counters(session, repair=repair)
+    return {
+        "drifted": [
+            {"user_id": user_id, "stored": stored, "actual": actual}
+            for user_id, (stored, actual) in sorted(drifted.items())
+        ],
+        "repaired": repair and bool(drifted),
+    }
 
 
 @router.get("/profile/", response_model=UserProfile)
-async def get_profile(user: User = Depends(get_current_user)):
+async def get_profile(user: Principal = Depends(get_current_principal)):
     return UserProfile(email=user.email, is_admin=user.is_admin)
 
 
@@ -58,9 +135,10 @@ async def get_profile(user: User = Depends(get_current_user)):
 async def logout(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     payload = await decode_token(token)
-    expires_at = datetime.fromtimestamp(payload.get("exp"))
-    await RevokedTokenRepository.revoke_token(session, token, expires_at)
+    expires_at = datetime.utcfromtimestamp(payload.get("exp"))
+    await RevokedTokenRepository.revoke_token(session, token_id(payload, token), expires_at)
+    invalidate_token(token)
     return {"message": "Successfully logged out"}
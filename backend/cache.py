@@ -0,0 +1,209 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None, size: int = 0):
+        if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self.pop(key)
+        self._data[key] = (value, time.monotonic() + ttl, size)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        ):
+            self.pop(next(iter(self._data)))
+            self.evictions += 1
+
+    def pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry[2]
+        return entry[0]
+
+    def discard_where(self, predicate):
+        for key in [key for key, (value, _, _) in self._data.items() if predicate(value)]:
+            self.pop(key)
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class TaskListCache(LRUCache):
+    """Encoded GET /tasks/ bodies keyed by (user_id, is_done, limit, cursor).
+
+    Values are ``(tasks_version, {content_encoding: body})``; an entry is only
+    served while the user's tasks_version still matches, which keeps workers
+    consistent, and writes in this process drop the user's entries at once.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: int):
+        super().__init__(maxsize, ttl, max_bytes)
+        self._by_user: dict[int, set] = {}
+
+    def lookup(self, key, version: int) -> dict | None:
+        entry = self.get(key)
+        if entry is None:
+            return None
+        if entry[0] != version:
+            self.hits -= 1
+            self.misses += 1
+            self.pop(key)
+            return None
+        return entry[1]
+
+    def store(self, key, version: int, bodies: dict):
+        self.set(key, (version, bodies), size=sum(len(body) for body in bodies.values()))
+        if key in self._data:
+            self._by_user.setdefault(key[0], set()).add(key)
+
+    def pop(self, key):
+        value = super().pop(key)
+        if value is not None:
+            keys = self._by_user.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[key[0]]
+        return value
+
+    def invalidate_user(self, user_id: int):
+        for key in list(self._by_user.get(user_id, ())):
+            self.pop(key)
+
+    def clear(self):
+        super().clear()
+        self._by_user.clear()
+
+
+class RevocationList:
+    """Revoked jti -> expiry, mirrored from the revoked_tokens table."""
+
+    def __init__(self):
+        self.loaded = False
+        self.last_id = 0
+        self._expiry: dict[str, datetime] = {}
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._expiry
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def add(self, jti: str, expires_at: datetime, row_id: int | None = None):
+        self._expiry[jti] = expires_at
+        if row_id is not None:
+            self.last_id = max(self.last_id, row_id)
+
+    def drop_expired(self, now: datetime):
+        for jti in [jti for jti, expires_at in self._expiry.items() if expires_at <= now]:
+            del self._expiry[jti]
+
+    def clear(self):
+        self.loaded = False
+        self.last_id = 0
+        self._expiry.clear()
+
+
+def token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# token hash -> (resolved User, jti). Hits are re-checked against
+# revoked_tokens and token_versions, which other workers' logouts and
+# token_version bumps reach through the database.
+principal_cache = LRUCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
+
+
+# user id -> current token_version, used by self-contained tokens.
+token_versions = LRUCache(
+    maxsize=int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TOKEN_VERSION_CACHE_TTL", "30")),
+)
+
+task_list_cache = TaskListCache(
+    maxsize=int(os.getenv("TASK_LIST_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TASK_LIST_CACHE_TTL", "300")),
+    max_bytes=int(os.getenv("TASK_LIST_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+revoked_tokens = RevocationList()
+
+
+def invalidate_token(token: str):
+    principal_cache.pop(token_cache_key(token))
+
+
+def invalidate_user(email: str):
+    principal_cache.discard_where(lambda entry: entry[0].email == email)
+
+
+def invalidate_user_tokens(user_id: int):
+    token_versions.pop(user_id)
+    principal_cache.discard_where(lambda entry: entry[0].id_user == user_id)
+
+
+def cache_stats() -> dict:
+    return {
+        "principal": principal_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "task_lists": task_list_cache.stats(),
+        "revoked_tokens": {"size": len(revoked_tokens), "loaded": revoked_tokens.loaded},
+    }
+
+
+def _reset_after_fork():
+    # A forked worker (gunicorn --preload and the like) starts with empty
+    # caches instead of a snapshot of the parent's.
+    for cache in (principal_cache, token_versions, task_list_cache, revoked_tokens):
+        cache.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
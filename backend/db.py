@@ -1,10 +1,88 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-DATABASE_URL = "sqlite+aiosqlite:///database.db"
-engine = create_async_engine(DATABASE_URL)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///database.db")
+# "production" applies SQLITE_PRAGMAS to every connection, "plain" leaves the
+# SQLite defaults alone (useful as a baseline for benchmarks).
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+SQLITE_PRAGMAS = {
+    # Only takes effect on a new database, and has to come before WAL.
+    # Lets the incremental_vacuum maintenance job return free pages.
+    "auto_vacuum": os.getenv("SQLITE_AUTO_VACUUM", "INCREMENTAL"),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative values are KiB: 64 MiB of page cache per connection.
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "foreign_keys": os.getenv("SQLITE_FOREIGN_KEYS", "ON"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+}
+
+
+def _engine_options(url: str) -> dict:
+    database = make_url(url).database
+    if database in (None, "", ":memory:"):
+        return {}
+    return {
+        **POOL_SETTINGS,
+        "connect_args": {"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+    }
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 new_session = async_sessionmaker(engine, expire_on_commit=False)
 
 
+@event.listens_for(engine.sync_engine, "connect")
+def _apply_pragmas(dbapi_connection, connection_record):
+    if DB_PROFILE != "production":
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+# Writer connections (execution option sqlite_begin_immediate) take the write
+# lock up front with BEGIN IMMEDIATE instead of upgrading a read lock later.
+# sqlite_read_snapshot opens a plain BEGIN so several reads see one snapshot.
+# Everything else keeps the driver's own handling, where reads run outside a
+# transaction and hold no lock while a request waits on the writer.
+@event.listens_for(engine.sync_engine, "begin")
+def _begin(conn):
+    dbapi_connection = conn.connection.dbapi_connection
+    options = conn.get_execution_options()
+    if options.get("sqlite_begin_immediate"):
+        dbapi_connection.isolation_level = None
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif options.get("sqlite_read_snapshot"):
+        dbapi_connection.isolation_level = None
+        conn.exec_driver_sql("BEGIN")
+    elif dbapi_connection.isolation_level is None:
+        dbapi_connection.isolation_level = ""
+
+
+def _dispose_after_fork():
+    # Pooled connections and their aiosqlite threads belong to the parent;
+    # the child drops them without closing and opens its own.
+    engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+
 async def get_session():
     async with new_session() as session:
         yield session
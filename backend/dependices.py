@@ -1,15 +1,44 @@
+import time
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from .security import oauth2_scheme, decode_token
+from .security import oauth2_scheme, decode_token, token_id, JWT_SELF_CONTAINED
 from .db import get_session
 from .models import User
 from .repositories import UserRepository, RevokedTokenRepository
+from .cache import principal_cache, token_cache_key, token_versions
+from .metrics import timed
+
+
+@dataclass(frozen=True)
+class Principal:
+    id_user: int
+    email: str
+    is_admin: bool
+
+
+def _revoked():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked",
+    )
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)
 ) -> User:
+    cache_key = token_cache_key(token)
+    cached = principal_cache.get(cache_key)
+    if cached is not None:
+        user, jti = cached
+        with timed("revocation"):
+            revoked = await RevokedTokenRepository.is_token_revoked(session, jti)
+        if revoked or await _current_token_version(session, user.id_user) != user.token_version:
+            principal_cache.pop(cache_key)
+            raise _revoked()
+        return user
+
     payload = await decode_token(token)
     email: str = payload.get("sub")
     if not email:
@@ -18,16 +47,65 @@ async def get_current_user(
             detail="Invalid authentication credentials",
         )
 
-    if await RevokedTokenRepository.is_token_revoked(session, token):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked",
-        )
+    jti = token_id(payload, token)
+    with timed("revocation"):
+        revoked = await RevokedTokenRepository.is_token_revoked(session, jti)
+    if revoked:
+        raise _revoked()
 
-    user = await UserRepository.get_user_by_email(session, email)
+    with timed("user"):
+        user = await UserRepository.get_user_by_email(session, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
+    if payload.get("ver", user.token_version) != user.token_version:
+        raise _revoked()
+    token_versions.set(user.id_user, user.token_version)
+    principal_cache.set(cache_key, (user, jti), ttl=payload["exp"] - time.time())
     return user
+
+
+async def _current_token_version(session: AsyncSession, user_id: int):
+    version = token_versions.get(user_id)
+    if version is None:
+        with timed("user"):
+            version = await UserRepository.get_token_version(session, user_id)
+        if version is not None:
+            token_versions.set(user_id, version)
+    return version
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)
+) -> Principal:
+    if not JWT_SELF_CONTAINED:
+        user = await get_current_user(token, session)
+        return Principal(id_user=user.id_user, email=user.email, is_admin=user.is_admin)
+
+    payload = await decode_token(token)
+    user_id = payload.get("uid")
+    if user_id is None:
+        # Issued before self-contained mode was switched on.
+        user = await get_current_user(token, session)
+        return Principal(id_user=user.id_user, email=user.email, is_admin=user.is_admin)
+
+    with timed("revocation"):
+        revoked = await RevokedTokenRepository.is_token_revoked(session, token_id(payload, token))
+    if revoked:
+        raise _revoked()
+
+    version = token_versions.get(user_id)
+    if version is None:
+        with timed("user"):
+            version = await UserRepository.get_token_version(session, user_id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found",
+            )
+        token_versions.set(user_id, version)
+    if payload.get("ver") != version:
+        raise _revoked()
+    return Principal(id_user=user_id, email=payload["sub"], is_admin=payload.get("adm", False))
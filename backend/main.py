@@ -1,35 +1,48 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.db import engine, get_session
+from sqlalchemy.exc import IntegrityError
+from backend.db import engine, get_session, new_session
 from backend.models import Base
-from backend.api import user_router, task_router
-from backend.repositories import UserRepository
+from backend.migrations import (
+    run_migrations,
+    schema_fingerprint,
+    stored_fingerprint,
+    store_fingerprint,
+)
+from backend.api import user_router, task_router, metrics_router
+from backend.metrics import RequestMetricsMiddleware, TimedJSONResponse
+from backend.repositories import UserRepository, RevokedTokenRepository
+from backend.scheduler import scheduler
+from backend.security import shutdown_password_pool
+from backend.writer import write_queue, DB_WRITE_QUEUE
+import contextlib
 import os
-from dotenv import load_dotenv
 import logging
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-app.include_router(user_router)
-app.include_router(task_router)
-
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # DDL only runs when the models or migrations changed since the last boot.
+    fingerprint = schema_fingerprint()
+    async with engine.connect() as conn:
+        if await conn.run_sync(stored_fingerprint) == fingerprint:
+            return
+    async with engine.connect() as conn:
+        # Holds the write lock, so workers booting together migrate one at a time.
+        await conn.execution_options(sqlite_begin_immediate=True)
+        async with conn.begin():
+            if await conn.run_sync(stored_fingerprint) == fingerprint:
+                return
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(run_migrations)
+            await conn.run_sync(store_fingerprint, fingerprint)
 
 
 async def create_default_admin():
@@ -41,23 +54,55 @@ async def create_default_admin():
         return
 
     async for session in get_session():
-        existing_admin = await UserRepository.get_user_by_email(session, admin_email)
-        if not existing_admin:
+        # Only a fresh database pays for hashing the password.
+        if await UserRepository.user_exists(session, admin_email):
+            logger.info("Admin user already exists")
+            return
+        try:
             await UserRepository.create_user(
                 session, email=admin_email, password=admin_password, is_admin=True
             )
             logger.info("Default admin user created!")
-        else:
+        except IntegrityError:
+            # Another worker created it first.
             logger.info("Admin user already exists")
 
 
-@app.on_event("startup")
-async def startup():
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
     await init_db()
+    if DB_WRITE_QUEUE:
+        write_queue.start()
     await create_default_admin()
+    async with new_session() as session:
+        await RevokedTokenRepository.load_revoked_tokens(session)
+    scheduler.start()
+    try:
+        yield
+    finally:
+        await scheduler.stop()
+        await write_queue.stop()
+        shutdown_password_pool()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=TimedJSONResponse)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+# Added last so it wraps everything else, CORS included.
+app.add_middleware(RequestMetricsMiddleware)
+app.include_router(user_router)
+app.include_router(task_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from backend.serve import main
 
-    uvicorn.run("main:app", reload=True)
+    main(["--reload"])
@@ -0,0 +1,223 @@
+import bisect
+import os
+import time
+from contextvars import ContextVar
+from collections import Counter
+from fastapi.responses import JSONResponse
+from backend.db import engine
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("scope", "phases", "queries", "statements")
+
+    def __init__(self, scope):
+        self.scope = scope
+        # Seconds per phase, filled in by timed() and the engine events in
+        # backend.sqlstats.
+        self.phases: dict[str, float] = {}
+        self.queries = 0
+        # Executions per SQL string, only kept when SQL_DEBUG is on.
+        self.statements: Counter | None = None
+
+
+# None outside of a request.
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def record(name: str, seconds: float):
+    stats = current_request.get()
+    if stats is not None:
+        stats.phases[name] = stats.phases.get(name, 0.0) + seconds
+
+
+class timed:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # labels -> [per-bucket counts with +Inf last, sum]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        # (route, phase) -> seconds
+        self.phase_seconds: dict[tuple, float] = {}
+        # route -> SQL statements executed
+        self.queries: dict[str, int] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        self.latency.observe((method, route, str(status)), seconds)
+        for name, value in stats.phases.items():
+            key = (route, name)
+            self.phase_seconds[key] = self.phase_seconds.get(key, 0.0) + value
+        if stats.queries:
+            self.queries[route] = self.queries.get(route, 0) + stats.queries
+
+
+request_metrics = RequestMetrics()
+
+
+def _route_label(scope) -> str:
+    # Path templates keep the label set bounded; unknown paths share one label.
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope["path"] if "endpoint" in scope else "unmatched"
+
+
+def server_timing(stats: RequestStats, total: float) -> bytes:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.phases.items()]
+    if stats.queries:
+        entries.append(f'queries;desc="{stats.queries}"')
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries).encode()
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing(stats, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", header)]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_metrics.in_flight -= 1
+            current_request.reset(token)
+            request_metrics.observe(
+                scope["method"], _route_label(scope), status, time.perf_counter() - started, stats
+            )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metric(name: str, kind: str, help_text: str, samples) -> list[str]:
+    # samples: iterable of (label names, label values, value)
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for names, values, value in samples:
+        lines.append(f"{name}{_labels(names, values)} {_format_value(value)}")
+    return lines
+
+
+def render_request_metrics() -> list[str]:
+    name = "http_request_duration_seconds"
+    lines = [
+        f"# HELP {name} Time from receiving a request to finishing its response.",
+        f"# TYPE {name} histogram",
+    ]
+    labels = ("method", "route", "status")
+    bounds = [*map(repr, LATENCY_BUCKETS), "+Inf"]
+    for values, (counts, total) in sorted(request_metrics.latency.series.items()):
+        cumulative = 0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_labels((*labels, 'le'), (*values, bound))} {cumulative}"
+            )
+        lines.append(f"{name}_sum{_labels(labels, values)} {total!r}")
+        lines.append(f"{name}_count{_labels(labels, values)} {cumulative}")
+
+    lines += render_metric(
+        "http_request_phase_seconds_total",
+        "counter",
+        "Time spent per request phase (jwt, revocation, user, password, db, write, serialize).",
+        (
+            (("route", "phase"), key, seconds)
+            for key, seconds in sorted(request_metrics.phase_seconds.items())
+        ),
+    )
+    lines += render_metric(
+        "http_request_queries_total",
+        "counter",
+        "SQL statements executed while handling requests.",
+        ((("route",), (route,), count) for route, count in sorted(request_metrics.queries.items())),
+    )
+    lines += render_metric(
+        "http_requests_in_flight",
+        "gauge",
+        "Requests currently being handled by this worker.",
+        [((), (), request_metrics.in_flight)],
+    )
+    return lines
+
+
+def render_pool_metrics() -> list[str]:
+    pool = engine.sync_engine.pool
+    lines = []
+    # Only QueuePool (file databases) tracks these; :memory: uses a static pool.
+    for attr, help_text in (
+        ("size", "Configured number of pooled connections."),
+        ("checkedout", "Connections currently in use."),
+        ("checkedin", "Idle connections in the pool."),
+        ("overflow", "Connections opened beyond the pool size."),
+    ):
+        method = getattr(pool, attr, None)
+        if method is not None:
+            lines += render_metric(f"db_pool_{attr}", "gauge", help_text, [((), (), method())])
+    return lines
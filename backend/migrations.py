@@ -0,0 +1,192 @@
+import hashlib
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex, CreateTable
+from backend.models import Base
+
+logger = logging.getLogger(__name__)
+
+# External-content FTS5 index over tasks. user_id is indexed as a token so a
+# search can be scoped to one user inside the MATCH itself.
+TASKS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        title, description, user_id,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description, user_id)
+        VALUES (new.id, new.title, new.description, new.user_id);
+    END""",
+    """CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.user_id);
+    END""",
+    """CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description, user_id ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, user_id)
+        VALUES ('delete', old.id, old.title, old.description, old.user_id);
+        INSERT INTO tasks_fts(rowid, title, description, user_id)
+        VALUES (new.id, new.title, new.description, new.user_id);
+    END""",
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+# Per-user active/done counts, kept exact by the database itself so every
+# write path (repository, bulk, direct SQL) updates them.
+TASK_COUNTERS_DDL = [
+    """CREATE TRIGGER task_counters_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_counters(user_id, active, done)
+        VALUES (new.user_id, new.is_done = 0, new.is_done != 0)
+        ON CONFLICT(user_id) DO UPDATE SET
+            active = active + excluded.active, done = done + excluded.done;
+    END""",
+    """CREATE TRIGGER task_counters_ad AFTER DELETE ON tasks BEGIN
+        UPDATE task_counters
+        SET active = active - (old.is_done = 0), done = done - (old.is_done != 0)
+        WHERE user_id = old.user_id;
+    END""",
+    """CREATE TRIGGER task_counters_au AFTER UPDATE OF is_done, user_id ON tasks
+    WHEN old.is_done IS NOT new.is_done OR old.user_id IS NOT new.user_id BEGIN
+        UPDATE task_counters
+        SET active = active - (old.is_done = 0), done = done - (old.is_done != 0)
+        WHERE user_id = old.user_id;
+        INSERT INTO task_counters(user_id, active, done)
+        VALUES (new.user_id, new.is_done = 0, new.is_done != 0)
+        ON CONFLICT(user_id) DO UPDATE SET
+            active = active + excluded.active, done = done + excluded.done;
+    END""",
+]
+
+REBUILD_TASK_COUNTERS = [
+    "DELETE FROM task_counters",
+    """INSERT INTO task_counters(user_id, active, done)
+    SELECT user_id, sum(is_done = 0), sum(is_done != 0) FROM tasks GROUP BY user_id""",
+]
+
+
+def _column_names(conn: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def revoked_tokens_by_jti(conn: Connection):
+    if "token" not in _column_names(conn, "revoked_tokens"):
+        return
+    rows = conn.execute(text("SELECT id, token FROM revoked_tokens")).all()
+    conn.execute(text("DROP INDEX IF EXISTS ix_revoked_tokens_token"))
+    conn.execute(text("ALTER TABLE revoked_tokens RENAME COLUMN token TO jti"))
+    for row_id, token in rows:
+        conn.execute(
+            text("UPDATE revoked_tokens SET jti = :jti WHERE id = :id"),
+            {"jti": hashlib.sha256(token.encode()).hexdigest(), "id": row_id},
+        )
+
+
+def users_token_version(conn: Connection):
+    if "token_version" not in _column_names(conn, "users"):
+        conn.execute(
+            text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0")
+        )
+
+
+def users_tasks_version(conn: Connection):
+    if "tasks_version" not in _column_names(conn, "users"):
+        conn.execute(
+            text("ALTER TABLE users ADD COLUMN tasks_version INTEGER NOT NULL DEFAULT 0")
+        )
+
+
+def users_tombstones_purged(conn: Connection):
+    if "tombstones_purged" not in _column_names(conn, "users"):
+        conn.execute(
+            text("ALTER TABLE users ADD COLUMN tombstones_purged INTEGER NOT NULL DEFAULT 0")
+        )
+
+
+def tasks_revision(conn: Connection):
+    columns = _column_names(conn, "tasks")
+    if "updated_at" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN updated_at DATETIME"))
+    if "revision" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"))
+
+
+def tasks_full_text_index(conn: Connection):
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+    ).first()
+    if exists:
+        return
+    try:
+        for statement in TASKS_FTS_DDL:
+            conn.execute(text(statement))
+    except OperationalError:
+        logger.warning("SQLite was built without FTS5, task search is disabled")
+
+
+def task_counters(conn: Connection):
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'task_counters_ai'")
+    ).first()
+    if exists:
+        return
+    for statement in TASK_COUNTERS_DDL + REBUILD_TASK_COUNTERS:
+        conn.execute(text(statement))
+
+
+def create_missing_indexes(conn: Connection):
+    # create_all() skips tables that already exist, including their new indexes.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    revoked_tokens_by_jti,
+    users_token_version,
+    users_tasks_version,
+    tasks_revision,
+    users_tombstones_purged,
+    tasks_full_text_index,
+    task_counters,
+    create_missing_indexes,
+]
+
+
+def run_migrations(conn: Connection):
+    for migration in MIGRATIONS:
+        migration(conn)
+
+
+def schema_fingerprint() -> str:
+    # Changes whenever a table, index, trigger or the list of migrations does.
+    dialect = sqlite.dialect()
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+    parts += TASKS_FTS_DDL + TASK_COUNTERS_DDL
+    parts += [migration.__name__ for migration in MIGRATIONS]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def stored_fingerprint(conn: Connection) -> str | None:
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_info'")
+    ).first()
+    if not exists:
+        return None
+    return conn.execute(text("SELECT value FROM schema_info WHERE key = 'fingerprint'")).scalar()
+
+
+def store_fingerprint(conn: Connection, fingerprint: str):
+    conn.execute(
+        text(
+            "INSERT INTO schema_info(key, value) VALUES ('fingerprint', :value) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+        ),
+        {"value": fingerprint},
+    )
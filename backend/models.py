@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.orm import Mapped, mapped_column, declarative_base, relationship
 
 Base = declarative_base()
@@ -12,24 +12,70 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String, nullable=False)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Bumped by every TaskRepository write; drives ETags of task lists.
+    tasks_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Newest revision whose tombstones were purged; a sync from an older
+    # revision could miss deletions and has to start over.
+    tombstones_purged: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
 
 class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    token: Mapped[str] = mapped_column(String(255), unique=True, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
+    jti: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # SQLite appends the rowid (id) to every index, so both also cover
+        # ordering by (created_at, id).
+        Index("ix_tasks_user_id_created_at", "user_id", "created_at"),
+        Index("ix_tasks_user_id_is_done_created_at", "user_id", "is_done", "created_at"),
+        Index("ix_tasks_user_id_revision", "user_id", "revision"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
     is_done: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=True)
+    # users.tasks_version of the write that last touched the row.
+    revision: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id_user"))
 
-    user: Mapped["User"] = relationship(backref="tasks")
\ No newline at end of file
+    user: Mapped["User"] = relationship(backref="tasks")
+
+
+class TaskCounter(Base):
+    # Maintained by triggers on tasks, see migrations.task_counters.
+    __tablename__ = "task_counters"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id_user"), primary_key=True)
+    active: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    done: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_revision", "user_id", "revision"),
+        Index("ix_task_tombstones_deleted_at", "deleted_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    task_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class SchemaInfo(Base):
+    __tablename__ = "schema_info"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(String, nullable=False)
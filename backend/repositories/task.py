@@ -1,38 +1,421 @@
-from backend.models import Task
-from sqlalchemy import select, update, delete
+import asyncio
+import re
+from datetime import datetime
+from backend.models import Task, TaskCounter, TaskTombstone, User
+from backend.writer import run_write
+from backend.cache import task_list_cache
+from sqlalchemy import select, insert, update, delete, tuple_, table, column, func, case, bindparam, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+tasks_fts = table("tasks_fts", column("rowid"), column("tasks_fts"))
+
+# bm25 weights for the title, description and user_id columns of tasks_fts.
+SEARCH_WEIGHTS = (10.0, 1.0, 0.0)
+
+
+def search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query)
+
+
+def _match_expression(user_id: int, terms: list[str]) -> str:
+    # Every term is quoted, so user input never reaches the FTS5 query syntax,
+    # and turned into a prefix query on the text columns only; otherwise "1"*
+    # would match the user_id token of users 1, 10, 12... The user_id column
+    # filter scopes the match to one user inside the index.
+    phrases = " ".join(f'"{term}"*' for term in terms)
+    return f"user_id:{user_id} AND {{title description}}: ({phrases})"
+
+
+def _user_tasks_query(stmt, user_id: int, is_done: bool, limit: int, after: tuple[datetime, int]):
+    stmt = stmt.where(Task.user_id == user_id)
+    if is_done is not None:
+        stmt = stmt.where(Task.is_done == is_done)
+    if after is not None:
+        stmt = stmt.where(tuple_(Task.created_at, Task.id) > after)
+    return stmt.order_by(Task.created_at, Task.id).limit(limit)
+
+
+def _owned_ids(user_id: int, ids: list[int]):
+    # "user_id + 0" keeps the ownership check out of index selection: without
+    # sqlite_stat1 SQLite would rather walk the user's (user_id, ...) index
+    # than look the ids up by rowid.
+    return and_(Task.id.in_(ids), Task.user_id + 0 == user_id)
+
+
+def _next_revision(user_id: int):
+    # The version the closing _bump_tasks_version() call of this write will set.
+    return (
+        select(User.tasks_version + 1).where(User.id_user == user_id).scalar_subquery()
+    )
+
+
+async def _bump_tasks_version(session: AsyncSession, user_id: int) -> int:
+    result = await session.execute(
+        update(User.__table__)
+        .where(User.id_user == user_id)
+        .values(tasks_version=User.tasks_version + 1)
+        .returning(User.tasks_version)
+    )
+    return result.scalar()
+
+
+async def _add_tombstones(session: AsyncSession, user_id: int, task_ids):
+    revision = await _bump_tasks_version(session, user_id)
+    await session.execute(
+        insert(TaskTombstone.__table__),
+        [{"task_id": task_id, "user_id": user_id, "revision": revision} for task_id in task_ids],
+    )
+
 
 class TaskRepository:
     @staticmethod
     async def create_task(session: AsyncSession, user_id: int, title: str, description: str = None):
-        task = Task(title=title, description=description, user_id=user_id)
-        session.add(task)
-        await session.commit()
-        await session.refresh(task)
-        return task
+        stmt = (
+            insert(Task.__table__)
+            .values(
+                title=title,
+                description=description,
+                user_id=user_id,
+                revision=_next_revision(user_id),
+            )
+            .returning(*Task.__table__.c)
+        )
+
+        async def operation(session: AsyncSession):
+            result = await session.execute(stmt)
+            task = result.one()
+            await _bump_tasks_version(session, user_id)
+            return task
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
 
     @staticmethod
-    async def get_user_tasks(session: AsyncSession, user_id: int, is_done: bool = None):
-        stmt = select(Task).where(Task.user_id == user_id)
-        if is_done is not None:
-            stmt = stmt.where(Task.is_done == is_done)
+    async def get_user_tasks(
+        session: AsyncSession,
+        user_id: int,
+        is_done: bool = None,
+        limit: int = None,
+        after: tuple[datetime, int] = None,
+    ):
+        stmt = _user_tasks_query(select(Task), user_id, is_done, limit, after)
         result = await session.execute(stmt)
         return result.scalars().all()
 
     @staticmethod
-    async def update_task(session: AsyncSession, task_id: int, user_id: int, data: dict):
+    async def get_user_task_rows(
+        session: AsyncSession,
+        user_id: int,
+        is_done: bool = None,
+        limit: int = None,
+        after: tuple[datetime, int] = None,
+    ):
+        # Plain rows with just the TaskResponse columns: no ORM instances,
+        # no identity map.
+        columns = select(Task.id, Task.title, Task.description, Task.is_done, Task.created_at)
+        stmt = _user_tasks_query(columns, user_id, is_done, limit, after)
+        result = await session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def get_tasks_version(session: AsyncSession, user_id: int) -> int:
+        result = await session.execute(
+            select(User.tasks_version).where(User.id_user == user_id)
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def stream_user_tasks(session: AsyncSession, user_id: int, batch_size: int = 1000):
+        # Server-side cursor in (created_at, id) order; batch_size rows at a time.
+        columns = select(Task.id, Task.title, Task.description, Task.is_done, Task.created_at)
+        stmt = _user_tasks_query(columns, user_id, None, None, None)
+        result = await session.stream(stmt)
+        async for rows in result.partitions(batch_size):
+            yield rows
+
+    @staticmethod
+    async def search_tasks(
+        session: AsyncSession, user_id: int, terms: list[str], limit: int, offset: int = 0
+    ):
         stmt = (
-            update(Task)
-            .where(Task.id == task_id, Task.user_id == user_id)
-            .values(**data)
-            .execution_options(synchronize_session="fetch")
+            select(Task.id, Task.title, Task.description, Task.is_done, Task.created_at)
+            .select_from(tasks_fts.join(Task, Task.id == tasks_fts.c.rowid))
+            .where(
+                tasks_fts.c.tasks_fts.match(_match_expression(user_id, terms)),
+                Task.user_id == user_id,
+            )
+            .order_by(func.bm25(tasks_fts.c.tasks_fts, *SEARCH_WEIGHTS), Task.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        result = await session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def get_task_summary(session: AsyncSession, user_id: int) -> tuple[int, int]:
+        result = await session.execute(
+            select(TaskCounter.active, TaskCounter.done).where(TaskCounter.user_id == user_id)
+        )
+        row = result.first()
+        return (row.active, row.done) if row else (0, 0)
+
+    @staticmethod
+    async def check_task_counters(session: AsyncSession, repair: bool = False) -> dict:
+        # Recount from tasks and compare with task_counters; with repair=True
+        # overwrite the rows that drifted. Returns {user_id: (stored, actual)}.
+        pending = case((Task.is_done, 0), else_=1)
+        actual = {
+            row.user_id: (row.active, row.done)
+            for row in await session.execute(
+                select(
+                    Task.user_id,
+                    func.sum(pending).label("active"),
+                    func.sum(1 - pending).label("done"),
+                ).group_by(Task.user_id)
+            )
+        }
+        stored = {
+            row.user_id: (row.active, row.done)
+            for row in await session.execute(
+                select(TaskCounter.user_id, TaskCounter.active, TaskCounter.done)
+            )
+        }
+        drifted = {
+            user_id: (stored.get(user_id, (0, 0)), actual.get(user_id, (0, 0)))
+            for user_id in actual.keys() | stored.keys()
+            if stored.get(user_id, (0, 0)) != actual.get(user_id, (0, 0))
+        }
+        if repair and drifted:
+            user_ids = list(drifted)
+            counts = (
+                select(Task.user_id, func.sum(pending), func.sum(1 - pending))
+                .where(Task.user_id.in_(user_ids))
+                .group_by(Task.user_id)
+            )
+
+            async def operation(session: AsyncSession):
+                # Recounted inside the write so concurrent task writes are not lost.
+                await session.execute(
+                    delete(TaskCounter.__table__).where(TaskCounter.user_id.in_(user_ids))
+                )
+                await session.execute(
+                    insert(TaskCounter.__table__).from_select(["user_id", "active", "done"], counts)
+                )
+
+            await run_write(session, operation)
+        return drifted
+
+    @staticmethod
+    async def get_changes(session: AsyncSession, user_id: int, since: int):
+        # Reads normally run in autocommit; these three share one snapshot, or
+        # a delete committed in between would list a task as both changed and
+        # deleted. The first commit ends whatever the session had open.
+        await session.commit()
+        await session.connection(execution_options={"sqlite_read_snapshot": True})
+        result = await session.execute(
+            select(User.tasks_version, User.tombstones_purged).where(User.id_user == user_id)
         )
-        await session.execute(stmt)
+        revision, purged = result.one_or_none() or (0, 0)
+        # Deletions up to `purged` are forgotten: send everything instead.
+        full_resync = 0 < since < purged
+        if full_resync:
+            since = 0
+        stmt = select(Task).where(Task.user_id == user_id)
+        if since > 0:
+            stmt = stmt.where(Task.revision > since)
+        changed = (await session.scalars(stmt.order_by(Task.revision, Task.id))).all()
+        deleted = []
+        if since > 0:
+            result = await session.scalars(
+                select(TaskTombstone.task_id)
+                .where(TaskTombstone.user_id == user_id, TaskTombstone.revision > since)
+                .order_by(TaskTombstone.revision)
+            )
+            deleted = result.all()
         await session.commit()
+        return revision, changed, deleted, full_resync
+
+    @staticmethod
+    async def purge_tombstones(
+        session: AsyncSession, older_than: datetime, batch_size: int = 500
+    ) -> int:
+        purged = 0
+        while True:
+            batch = (
+                select(TaskTombstone.id, TaskTombstone.user_id, TaskTombstone.revision)
+                .where(TaskTombstone.deleted_at < older_than)
+                .order_by(TaskTombstone.deleted_at)
+                .limit(batch_size)
+            )
+
+            async def operation(session: AsyncSession):
+                rows = (await session.execute(batch)).all()
+                if not rows:
+                    return 0
+                newest: dict[int, int] = {}
+                for _, user_id, revision in rows:
+                    newest[user_id] = max(revision, newest.get(user_id, 0))
+                await session.execute(
+                    update(User.__table__)
+                    .where(User.id_user == bindparam("uid"))
+                    .values(tombstones_purged=func.max(User.tombstones_purged, bindparam("revision"))),
+                    [{"uid": user_id, "revision": revision} for user_id, revision in newest.items()],
+                )
+                await session.execute(
+                    delete(TaskTombstone).where(TaskTombstone.id.in_([row.id for row in rows]))
+                )
+                return len(rows)
+
+            deleted = await run_write(session, operation)
+            purged += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+        return purged
+
+    @staticmethod
+    async def update_task(session: AsyncSession, task_id: int, user_id: int, data: dict):
+        tasks = Task.__table__
+        condition = (tasks.c.id == task_id) & (tasks.c.user_id == user_id)
+        if not data:
+            result = await session.execute(select(tasks).where(condition))
+            return result.first()
+        stmt = (
+            update(tasks)
+            .where(condition)
+            .values(**data, updated_at=datetime.utcnow(), revision=_next_revision(user_id))
+            .returning(*tasks.c)
+        )
+
+        async def operation(session: AsyncSession):
+            result = await session.execute(stmt)
+            task = result.first()
+            if task is not None:
+                await _bump_tasks_version(session, user_id)
+            return task
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
 
     @staticmethod
     async def delete_task(session: AsyncSession, task_id: int, user_id: int):
-        stmt = delete(Task).where(Task.id == task_id, Task.user_id == user_id)
-        await session.execute(stmt)
-        await session.commit()
+        tasks = Task.__table__
+        stmt = (
+            delete(tasks)
+            .where(tasks.c.id == task_id, tasks.c.user_id == user_id)
+            .returning(tasks.c.id)
+        )
+
+        async def operation(session: AsyncSession):
+            result = await session.execute(stmt)
+            deleted = result.first() is not None
+            if deleted:
+                await _add_tombstones(session, user_id, [task_id])
+            return deleted
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
+
+    @staticmethod
+    async def create_tasks(session: AsyncSession, user_id: int, items: list[dict]):
+        # Core insert so every row shares one multi-row INSERT ... RETURNING.
+        # SQLite hands out ascending ids in VALUES order, which restores the
+        # caller's order without a row-at-a-time "sorted" insert.
+        stmt = (
+            insert(Task.__table__)
+            .values(revision=_next_revision(user_id))
+            .returning(*Task.__table__.c)
+        )
+        rows = [
+            {"title": item["title"], "description": item.get("description"), "user_id": user_id}
+            for item in items
+        ]
+
+        async def operation(session: AsyncSession):
+            result = await session.execute(stmt, rows)
+            tasks = sorted(result.all(), key=lambda row: row.id)
+            await _bump_tasks_version(session, user_id)
+            return tasks
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
+
+    @staticmethod
+    async def import_tasks(session: AsyncSession, user_id: int, items: list[dict]) -> int:
+        # Like create_tasks, but nothing is returned: imports come in large
+        # chunks and only the count is reported.
+        stmt = insert(Task.__table__).values(revision=_next_revision(user_id))
+        now = datetime.utcnow()
+        rows = [
+            {
+                "title": item["title"],
+                "description": item.get("description"),
+                "is_done": item.get("is_done", False),
+                "created_at": item.get("created_at") or now,
+                "user_id": user_id,
+            }
+            for item in items
+        ]
+
+        async def operation(session: AsyncSession):
+            await session.execute(stmt, rows)
+            await _bump_tasks_version(session, user_id)
+            return len(rows)
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
+
+    @staticmethod
+    async def update_tasks(session: AsyncSession, user_id: int, items: list[dict]):
+        # One UPDATE per distinct set of new values; bulk edits usually share one.
+        groups: dict[tuple, list[int]] = {}
+        for item in items:
+            values = tuple(sorted((k, v) for k, v in item.items() if k != "id"))
+            groups.setdefault(values, []).append(item["id"])
+
+        async def operation(session: AsyncSession):
+            updated = {}
+            for values, ids in groups.items():
+                if values:
+                    stmt = (
+                        update(Task)
+                        .where(_owned_ids(user_id, ids))
+                        .values(
+                            **dict(values),
+                            updated_at=datetime.utcnow(),
+                            revision=_next_revision(user_id),
+                        )
+                        .returning(Task)
+                        .execution_options(synchronize_session=False)
+                    )
+                else:
+                    stmt = select(Task).where(_owned_ids(user_id, ids))
+                for task in await session.scalars(stmt):
+                    updated[task.id] = task
+            if updated:
+                await _bump_tasks_version(session, user_id)
+            return updated
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
+
+    @staticmethod
+    async def delete_tasks(session: AsyncSession, user_id: int, ids: list[int]):
+        stmt = delete(Task).where(_owned_ids(user_id, ids)).returning(Task.id)
+
+        async def operation(session: AsyncSession):
+            result = await session.scalars(stmt)
+            deleted = set(result.all())
+            if deleted:
+                await _add_tombstones(session, user_id, deleted)
+            return deleted
+
+        result = await run_write(session, operation)
+        task_list_cache.invalidate_user(user_id)
+        return result
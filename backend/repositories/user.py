@@ -1,9 +1,35 @@
+import asyncio
 from datetime import datetime
 
+from sqlalchemy import delete, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from backend.models import User, RevokedToken
-from backend.security import hash_password
+from backend.models import User, RevokedToken, TaskCounter
+from backend.security import hash_password_async
+from backend.cache import invalidate_user, invalidate_user_tokens, revoked_tokens
+from backend.writer import run_write
+
+
+def _users_query(email_prefix: str = None, after: str = None, with_task_counts: bool = False):
+    columns = [User.id_user, User.email, User.is_admin]
+    if with_task_counts:
+        columns += [
+            func.coalesce(TaskCounter.active, 0).label("active_tasks"),
+            func.coalesce(TaskCounter.done, 0).label("done_tasks"),
+        ]
+    stmt = select(*columns)
+    if with_task_counts:
+        stmt = stmt.outerjoin(TaskCounter, TaskCounter.user_id == User.id_user)
+    # Ordered and paged by email, so both the prefix range and the keyset
+    # walk the unique email index.
+    if email_prefix:
+        # U+10FFFF sorts after every other character, and unlike "last
+        # character + 1" it can't overflow.
+        upper = email_prefix + "\U0010ffff"
+        stmt = stmt.where(User.email >= email_prefix, User.email <= upper)
+    if after is not None:
+        stmt = stmt.where(User.email > after)
+    return stmt.order_by(User.email)
 
 
 class UserRepository:
@@ -12,33 +38,133 @@ class UserRepository:
         result = await session.execute(select(User).where(User.email == email))
         return result.scalars().first()
 
+    @staticmethod
+    async def user_exists(session: AsyncSession, email: str) -> bool:
+        result = await session.execute(select(User.id_user).where(User.email == email))
+        return result.first() is not None
+
     @staticmethod
     async def create_user(
         session: AsyncSession, email: str, password: str, is_admin: bool = False
     ):
-        hashed_password = hash_password(password)
-        new_user = User(email=email, password_hash=hashed_password, is_admin=is_admin)
-        session.add(new_user)
-        await session.commit()
-        await session.refresh(new_user)
+        hashed_password = await hash_password_async(password)
+
+        async def operation(session: AsyncSession):
+            new_user = User(email=email, password_hash=hashed_password, is_admin=is_admin)
+            session.add(new_user)
+            await session.flush()
+            return new_user
+
+        new_user = await run_write(session, operation)
+        invalidate_user(email)
         return new_user
 
     @staticmethod
-    async def get_all_users(session: AsyncSession):
-        result = await session.execute(select(User))
-        return result.scalars().all()
+    async def get_token_version(session: AsyncSession, user_id: int):
+        result = await session.execute(
+            select(User.token_version).where(User.id_user == user_id)
+        )
+        return result.scalar()
+
+    @staticmethod
+    async def bump_token_version(session: AsyncSession, user_id: int):
+        stmt = (
+            update(User)
+            .where(User.id_user == user_id)
+            .values(token_version=User.token_version + 1)
+        )
+
+        async def operation(session: AsyncSession):
+            result = await session.execute(stmt)
+            return result.rowcount
+
+        updated = await run_write(session, operation)
+        invalidate_user_tokens(user_id)
+        return updated > 0
+
+    @staticmethod
+    async def get_users(
+        session: AsyncSession,
+        limit: int,
+        after: str = None,
+        email_prefix: str = None,
+        with_task_counts: bool = False,
+    ):
+        stmt = _users_query(email_prefix, after, with_task_counts).limit(limit)
+        result = await session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def stream_users(
+        session: AsyncSession,
+        after: str = None,
+        email_prefix: str = None,
+        with_task_counts: bool = False,
+        batch_size: int = 500,
+    ):
+        # Server-side cursor: rows are fetched batch_size at a time.
+        result = await session.stream(_users_query(email_prefix, after, with_task_counts))
+        async for rows in result.partitions(batch_size):
+            yield rows
 
 
 class RevokedTokenRepository:
     @staticmethod
-    async def revoke_token(session: AsyncSession, token: str, expires_at: datetime):
-        revoked_token = RevokedToken(token=token, expires_at=expires_at)
-        session.add(revoked_token)
-        await session.commit()
+    async def revoke_token(session: AsyncSession, jti: str, expires_at: datetime):
+        async def operation(session: AsyncSession):
+            session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            await session.flush()
+
+        await run_write(session, operation)
+        revoked_tokens.add(jti, expires_at)
+
+    @staticmethod
+    async def is_token_revoked(session: AsyncSession, jti: str):
+        if revoked_tokens.loaded:
+            return jti in revoked_tokens
+        result = await session.execute(
+            select(RevokedToken.id).where(RevokedToken.jti == jti)
+        )
+        return result.first() is not None
 
     @staticmethod
-    async def is_token_revoked(session: AsyncSession, token: str):
+    async def load_revoked_tokens(session: AsyncSession):
+        # Incremental: only rows written since the last call, by any worker.
         result = await session.execute(
-            select(RevokedToken).where(RevokedToken.token == token)
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(
+                RevokedToken.id > revoked_tokens.last_id,
+                RevokedToken.expires_at > datetime.utcnow(),
+            )
+            .order_by(RevokedToken.id)
         )
-        return result.scalars().first() is not None
+        for row_id, jti, expires_at in result:
+            revoked_tokens.add(jti, expires_at, row_id)
+        revoked_tokens.loaded = True
+
+    @staticmethod
+    async def purge_expired_tokens(session: AsyncSession, batch_size: int = 500) -> int:
+        now = datetime.utcnow()
+        # The newest row is never purged, so ids keep growing and the
+        # incremental reload above cannot miss a reused id.
+        newest = select(func.max(RevokedToken.id)).scalar_subquery()
+        purged = 0
+        while True:
+            batch = (
+                select(RevokedToken.id)
+                .where(RevokedToken.expires_at <= now, RevokedToken.id < newest)
+                .limit(batch_size)
+            )
+            stmt = delete(RevokedToken).where(RevokedToken.id.in_(batch))
+
+            async def operation(session: AsyncSession):
+                result = await session.execute(stmt)
+                return result.rowcount
+
+            deleted = await run_write(session, operation)
+            purged += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+        revoked_tokens.drop_expired(now)
+        return purged
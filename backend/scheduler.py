@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db import engine, new_session
+from backend.repositories import RevokedTokenRepository, TaskRepository
+from backend.writer import run_write
+
+logger = logging.getLogger(__name__)
+
+# Interval of every job in seconds; 0 disables the job.
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+REVOCATION_SWEEP_SECONDS = float(os.getenv("REVOCATION_SWEEP_SECONDS", "3600"))
+REVOCATION_SWEEP_BATCH = int(os.getenv("REVOCATION_SWEEP_BATCH", "500"))
+DB_OPTIMIZE_SECONDS = float(os.getenv("DB_OPTIMIZE_SECONDS", "3600"))
+# Rows ANALYZE samples per index, which keeps one optimize run short.
+DB_ANALYSIS_LIMIT = int(os.getenv("DB_ANALYSIS_LIMIT", "400"))
+DB_CHECKPOINT_SECONDS = float(os.getenv("DB_CHECKPOINT_SECONDS", "300"))
+DB_VACUUM_SECONDS = float(os.getenv("DB_VACUUM_SECONDS", "3600"))
+DB_VACUUM_PAGES = int(os.getenv("DB_VACUUM_PAGES", "64"))
+TASK_COUNTERS_CHECK_SECONDS = float(os.getenv("TASK_COUNTERS_CHECK_SECONDS", "86400"))
+TOMBSTONE_SWEEP_SECONDS = float(os.getenv("TOMBSTONE_SWEEP_SECONDS", "3600"))
+TOMBSTONE_SWEEP_BATCH = int(os.getenv("TOMBSTONE_SWEEP_BATCH", "500"))
+# Clients that last synced longer ago than this get a full resync.
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+
+@dataclass
+class Job:
+    name: str
+    interval: float
+    func: Callable[[], Awaitable]
+    runs: int = 0
+    failures: int = 0
+    last_duration: float = 0.0
+    last_result: object = None
+    task: asyncio.Task = field(default=None, repr=False)
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs: dict[str, Job] = {}
+
+    def add(self, name: str, interval: float, func: Callable[[], Awaitable]):
+        if interval > 0:
+            self.jobs[name] = Job(name, interval, func)
+
+    def start(self):
+        for job in self.jobs.values():
+            job.task = asyncio.create_task(self._run(job), name=f"job:{job.name}")
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.task is None:
+                continue
+            job.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await job.task
+            job.task = None
+
+    def reset(self):
+        # Forgets the job tasks of a parent process after fork.
+        for job in self.jobs.values():
+            job.task = None
+
+    async def _run(self, job: Job):
+        while True:
+            await asyncio.sleep(job.interval)
+            started = time.perf_counter()
+            try:
+                job.last_result = await job.func()
+            except Exception:
+                job.failures += 1
+                logger.exception("Maintenance job %s failed", job.name)
+            job.runs += 1
+            job.last_duration = time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            job.name: {
+                "interval": job.interval,
+                "runs": job.runs,
+                "failures": job.failures,
+                "last_duration": job.last_duration,
+                "last_result": job.last_result,
+            }
+            for job in self.jobs.values()
+        }
+
+
+async def refresh_revocations():
+    # Picks up logouts from other workers.
+    async with new_session() as session:
+        await RevokedTokenRepository.load_revoked_tokens(session)
+
+
+async def purge_revoked_tokens():
+    async with new_session() as session:
+        purged = await RevokedTokenRepository.purge_expired_tokens(
+            session, batch_size=REVOCATION_SWEEP_BATCH
+        )
+    if purged:
+        logger.info("Purged %d expired revoked tokens", purged)
+    return purged
+
+
+async def optimize_database():
+    # ANALYZE writes sqlite_stat1, so it goes through the writer like any write.
+    async def operation(session: AsyncSession):
+        await session.execute(text(f"PRAGMA analysis_limit={DB_ANALYSIS_LIMIT}"))
+        await session.execute(text("PRAGMA optimize"))
+
+    async with new_session() as session:
+        await run_write(session, operation)
+
+
+async def checkpoint_wal():
+    # PASSIVE copies what it can without waiting for readers or writers.
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+        busy, log_frames, checkpointed = result.one()
+    return {"busy": busy, "log": log_frames, "checkpointed": checkpointed}
+
+
+async def vacuum_free_pages():
+    # Only databases created with auto_vacuum=INCREMENTAL can give pages back.
+    async with engine.connect() as conn:
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+            return 0
+
+    async def operation(session: AsyncSession):
+        free = (await session.execute(text("PRAGMA freelist_count"))).scalar()
+        pages = min(free, DB_VACUUM_PAGES)
+        # The driver steps the pragma only once, which frees a single page.
+        for _ in range(pages):
+            (await session.execute(text("PRAGMA incremental_vacuum(1)"))).close()
+        return pages
+
+    # One short write per slice of pages, so requests queue behind at most one.
+    total = 0
+    async with new_session() as session:
+        while freed := await run_write(session, operation):
+            total += freed
+            await asyncio.sleep(0)
+    return total
+
+
+async def check_task_counters():
+    async with new_session() as session:
+        drifted = await TaskRepository.check_task_counters(session, repair=True)
+    if drifted:
+        logger.warning("Repaired task counters of %d users", len(drifted))
+    return len(drifted)
+
+
+async def purge_tombstones():
+    older_than = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    async with new_session() as session:
+        purged = await TaskRepository.purge_tombstones(
+            session, older_than, batch_size=TOMBSTONE_SWEEP_BATCH
+        )
+    if purged:
+        logger.info("Purged %d task tombstones", purged)
+    return purged
+
+
+scheduler = Scheduler()
+scheduler.add("refresh_revocations", REVOCATION_REFRESH_SECONDS, refresh_revocations)
+scheduler.add("purge_revoked_tokens", REVOCATION_SWEEP_SECONDS, purge_revoked_tokens)
+scheduler.add("optimize", DB_OPTIMIZE_SECONDS, optimize_database)
+scheduler.add("checkpoint_wal", DB_CHECKPOINT_SECONDS, checkpoint_wal)
+scheduler.add("incremental_vacuum", DB_VACUUM_SECONDS, vacuum_free_pages)
+scheduler.add("check_task_counters", TASK_COUNTERS_CHECK_SECONDS, check_task_counters)
+scheduler.add("purge_tombstones", TOMBSTONE_SWEEP_SECONDS, purge_tombstones)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=scheduler.reset)
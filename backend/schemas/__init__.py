@@ -1,4 +1,20 @@
-from .user import UserCreate, UserResponse, UserLogin, UserProfile, Token
-from .task import TaskResponse, TaskCreate, TaskUpdate
+from .user import UserCreate, UserResponse, UserListItem, UserPage, UserLogin, UserProfile, Token
+from .task import (
+    TaskResponse,
+    TaskCreate,
+    TaskImportItem,
+    TaskImportResult,
+    TaskUpdate,
+    TaskPage,
+    TaskChange,
+    TaskChanges,
+    TaskSearchPage,
+    TaskSummary,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkDelete,
+    TaskBulkResult,
+    TaskBulkResponse,
+)
 
-__all__ = "UserCreate, UserResponse, UserLogin, UserProfile, Token, TaskResponse, TaskCreate, TaskUpdate"
+__all__ = "UserCreate, UserResponse, UserListItem, UserPage, UserLogin, UserProfile, Token, TaskResponse, TaskCreate, TaskImportItem, TaskImportResult, TaskUpdate, TaskPage, TaskChange, TaskChanges, TaskSearchPage, TaskSummary, TaskBulkCreate, TaskBulkUpdate, TaskBulkDelete, TaskBulkResult, TaskBulkResponse"
@@ -1,13 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 
+MAX_BULK_ITEMS = 1000
+
 
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
 
 
+class TaskImportItem(TaskCreate):
+    is_done: bool = False
+    created_at: Optional[datetime] = None
+
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[dict]
+
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -22,4 +35,58 @@ class TaskResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TaskChange(TaskResponse):
+    updated_at: Optional[datetime]
+    revision: int
+
+
+class TaskChanges(BaseModel):
+    revision: int
+    changed: list[TaskChange]
+    deleted: list[int]
+    full_resync: bool = False
+
+
+class TaskSummary(BaseModel):
+    active: int
+    done: int
+    total: int
+
+
+class TaskPage(BaseModel):
+    items: list[TaskResponse]
+    next_cursor: Optional[str] = None
+
+
+class TaskSearchPage(BaseModel):
+    items: list[TaskResponse]
+    next_offset: Optional[int] = None
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+
+class TaskBulkCreate(BaseModel):
+    items: list[TaskCreate] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TaskBulkUpdate(BaseModel):
+    items: list[TaskBulkUpdateItem] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TaskBulkDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TaskBulkResult(BaseModel):
+    id: Optional[int]
+    status: str
+    task: Optional[TaskResponse] = None
+
+
+class TaskBulkResponse(BaseModel):
+    results: list[TaskBulkResult]
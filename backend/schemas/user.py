@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel, EmailStr
 
 
@@ -15,6 +16,16 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class UserListItem(UserResponse):
+    active_tasks: Optional[int] = None
+    done_tasks: Optional[int] = None
+
+
+class UserPage(BaseModel):
+    items: list[UserListItem]
+    next_cursor: Optional[str] = None
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
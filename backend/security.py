@@ -1,24 +1,114 @@
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+import asyncio
+import functools
+import hashlib
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException, status
+from backend.metrics import timed
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Put id, admin flag and token version into the token so that requests can be
+# authenticated without loading the user row.
+JWT_SELF_CONTAINED = os.getenv("JWT_SELF_CONTAINED", "0") == "1"
+
+# bcrypt is CPU bound, so it runs in a separate pool instead of the event loop.
+# PASSWORD_POOL_WORKERS=0 keeps the old inline behaviour.
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread")
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", "64"))
+
+_password_executor: Executor | None = None
+_password_pending = 0
+
+
+# passlib and jose are imported on first use: together they are ~50 ms of
+# import time that a worker does not need before its first login.
+@functools.cache
+def _pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
+
+
+def _get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_POOL_KIND == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_POOL_WORKERS, thread_name_prefix="password"
+            )
+    return _password_executor
+
+
+async def _run_password_job(func, *args):
+    global _password_pending
+    if PASSWORD_POOL_WORKERS <= 0:
+        return func(*args)
+    if _password_pending >= PASSWORD_POOL_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        with timed("password"):
+            return await loop.run_in_executor(_get_password_executor(), func, *args)
+    finally:
+        _password_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+def password_pool_stats() -> dict:
+    return {
+        "kind": PASSWORD_POOL_KIND,
+        "workers": PASSWORD_POOL_WORKERS,
+        "pending": _password_pending,
+        "max_pending": PASSWORD_POOL_MAX_PENDING,
+    }
+
+
+def shutdown_password_pool():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
+def _reset_pool_after_fork():
+    # Executor threads/processes are not inherited by a forked child.
+    global _password_executor, _password_pending
+    _password_executor = None
+    _password_pending = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -26,13 +116,30 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     expire = datetime.utcnow() + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": secrets.token_urlsafe(12)})
+    from jose import jwt
+
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def access_token_claims(user) -> dict:
+    claims = {"sub": user.email, "ver": user.token_version}
+    if JWT_SELF_CONTAINED:
+        claims.update({"uid": user.id_user, "adm": user.is_admin})
+    return claims
+
+
+def token_id(payload: dict, token: str) -> str:
+    # Tokens issued before jti was added are identified by their hash.
+    return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
 async def decode_token(token: str) -> dict:
+    from jose import jwt, JWTError
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with timed("jwt"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         raise HTTPException(
@@ -0,0 +1,89 @@
+import argparse
+import importlib.util
+import os
+import uvicorn
+
+# Run from the repository root:
+#
+#     python -m backend.serve --workers 4
+#
+# Every option also has an environment variable, so containers can be
+# configured without a custom command line. uvicorn starts its workers with
+# "spawn"; servers that fork a preloaded app (gunicorn --preload with
+# uvicorn workers) are covered by the after-fork hooks in backend.db,
+# backend.cache, backend.security, backend.writer and backend.scheduler.
+
+
+def _optional(module: str, flag: str, parser: argparse.ArgumentParser):
+    if importlib.util.find_spec(module) is None:
+        parser.error(f"{flag} needs the {module} package")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the backend API.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="worker processes sharing the socket",
+    )
+    parser.add_argument(
+        "--loop", choices=["auto", "asyncio", "uvloop"], default=os.getenv("SERVE_LOOP", "auto"),
+        help="auto uses uvloop when it is installed",
+    )
+    parser.add_argument(
+        "--http", choices=["auto", "h11", "httptools"], default=os.getenv("SERVE_HTTP", "auto"),
+        help="auto uses httptools when it is installed",
+    )
+    parser.add_argument(
+        "--keep-alive", type=int, default=int(os.getenv("SERVE_KEEP_ALIVE", "5")),
+        help="seconds an idle connection is kept open",
+    )
+    parser.add_argument(
+        "--backlog", type=int, default=int(os.getenv("SERVE_BACKLOG", "2048")),
+        help="pending connections the socket queues",
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30")),
+        help="seconds in-flight requests get to finish after SIGTERM",
+    )
+    parser.add_argument(
+        "--limit-concurrency", type=int, default=int(os.getenv("SERVE_LIMIT_CONCURRENCY", "0")),
+        help="answer 503 above this many concurrent connections per worker (0: no limit)",
+    )
+    parser.add_argument("--log-level", default=os.getenv("SERVE_LOG_LEVEL", "info"))
+    parser.add_argument("--reload", action="store_true", help="development only, one worker")
+    args = parser.parse_args(argv)
+
+    if args.loop == "uvloop":
+        _optional("uvloop", "--loop uvloop", parser)
+    if args.http == "httptools":
+        _optional("httptools", "--http httptools", parser)
+    if args.reload and args.workers > 1:
+        parser.error("--reload runs a single worker")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # On SIGTERM uvicorn stops accepting connections, waits up to
+    # --graceful-timeout for running requests and then runs the lifespan
+    # shutdown, which drains the write queue before exiting.
+    uvicorn.run(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_concurrency=args.limit_concurrency or None,
+        log_level=args.log_level,
+        reload=args.reload,
+    )
+
+
+if __name__ == "__main__":
+    main()
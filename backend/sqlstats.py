@@ -0,0 +1,149 @@
+import contextlib
+import logging
+import os
+import time
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.db import engine
+from backend.metrics import current_request
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their parameters and plan; 0 disables.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+# Development mode: warn about lazy relationship loads and statements that
+# repeat within one request, the usual shapes of an N+1.
+SQL_DEBUG = os.getenv("SQL_DEBUG", "0") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+MAX_LOGGED_PARAMETER = 200
+
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Emitted by backend.db for every transaction: timed, but not counted as queries.
+_TRANSACTION_STATEMENTS = frozenset({"BEGIN", "BEGIN IMMEDIATE"})
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+# Process-wide "queries" and "slow" totals for /metrics.
+query_totals = Counter()
+
+# Budgets count every statement on the engine, the writer task's included.
+_budgets: list[QueryBudget] = []
+
+
+@contextlib.contextmanager
+def query_budget(max_queries: int):
+    # with query_budget(3): await client.get("/tasks/", headers=headers)
+    budget = QueryBudget(max_queries)
+    _budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        _budgets.remove(budget)
+    if budget.count > max_queries:
+        statements = "\n".join(f"  {statement}" for statement in budget.statements)
+        raise QueryBudgetExceeded(
+            f"{budget.count} queries, budget is {max_queries}:\n{statements}"
+        )
+
+
+def _short(value) -> str:
+    text = repr(value)
+    return text if len(text) <= MAX_LOGGED_PARAMETER else text[:MAX_LOGGED_PARAMETER] + "..."
+
+
+def _explain(conn, statement, parameters, executemany) -> str:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return ""
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    # A raw cursor, so the EXPLAIN does not go through these events again.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(f"  {row[-1]}" for row in cursor.fetchall())
+    except Exception as exc:
+        return f"  (no plan: {exc})"
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed):
+    if executemany:
+        shown = f"{len(parameters)} rows, first {_short(parameters[0]) if parameters else '()'}"
+    else:
+        shown = _short(parameters)
+    plan = _explain(conn, statement, parameters, executemany) if SLOW_QUERY_EXPLAIN else ""
+    logger.warning(
+        "Slow query (%.1f ms): %s\n  parameters: %s%s",
+        elapsed * 1000,
+        statement,
+        shown,
+        f"\n  plan:\n{plan}" if plan else "",
+    )
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        query_totals["slow"] += 1
+        _log_slow_query(conn, statement, parameters, executemany, elapsed)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.phases["db"] = stats.phases.get("db", 0.0) + elapsed
+    if statement in _TRANSACTION_STATEMENTS:
+        return
+    query_totals["queries"] += 1
+    for budget in _budgets:
+        budget.statements.append(statement)
+    if stats is None:
+        return
+    stats.queries += 1
+    if SQL_DEBUG:
+        if stats.statements is None:
+            stats.statements = Counter()
+        stats.statements[statement] += 1
+        if stats.statements[statement] == N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                "Possible N+1 in %s %s: the same statement ran %d times: %s",
+                stats.scope["method"],
+                stats.scope["path"],
+                N_PLUS_ONE_THRESHOLD,
+                statement,
+            )
+
+
+if SQL_DEBUG:
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _warn_lazy_load(orm_execute_state):
+        # Lazy loads (Task.user, User.tasks) issue one query per object; in
+        # async code they fail outright, so load them with selectinload().
+        if not orm_execute_state.is_relationship_load or orm_execute_state.lazy_loaded_from is None:
+            return
+        stats = current_request.get()
+        where = f" in {stats.scope['method']} {stats.scope['path']}" if stats else ""
+        logger.warning(
+            "Lazy load of %s%s", orm_execute_state.loader_strategy_path.prop, where
+        )
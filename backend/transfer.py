@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import datetime
+from pydantic import ValidationError
+from backend.encoding import json_bytes
+from backend.schemas import TaskImportItem
+
+EXPORT_FIELDS = ("id", "title", "description", "is_done", "created_at")
+MAX_IMPORT_LINE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+class ImportLineTooLong(ValueError):
+    pass
+
+
+def csv_header() -> bytes:
+    return (",".join(EXPORT_FIELDS) + "\r\n").encode()
+
+
+def export_chunk(rows, fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return b"".join(json_bytes(row._asdict()) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value for value in row
+        )
+    return buffer.getvalue().encode()
+
+
+async def _lines(chunks):
+    # Splits the upload on b"\n" without holding more than one line in memory.
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        if len(pending) > MAX_IMPORT_LINE:
+            raise ImportLineTooLong()
+        for line in lines:
+            # A chunk can hold whole lines that never end up in `pending`.
+            if len(line) > MAX_IMPORT_LINE:
+                raise ImportLineTooLong()
+            yield line
+    if pending:
+        yield pending
+
+
+async def _ndjson_records(chunks):
+    line_no = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, None
+
+
+async def _csv_records(chunks):
+    # A quoted field may span lines: a record ends only where the number of
+    # quote characters seen so far is even.
+    header = None
+    record, quotes, size, line_no = [], 0, 0, 0
+    async for line in _lines(chunks):
+        line_no += 1
+        text = line.decode("utf-8-sig" if line_no == 1 else "utf-8", errors="replace")
+        record.append(text)
+        quotes += text.count('"')
+        size += len(line) + 1
+        if quotes % 2:
+            # An unclosed quote would otherwise buffer the rest of the upload.
+            if size > MAX_IMPORT_LINE:
+                raise ImportLineTooLong()
+            continue
+        values = next(csv.reader(io.StringIO("\n".join(record))), [])
+        record, quotes, size = [], 0, 0
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        # Empty cells fall back to the field defaults.
+        yield line_no, {name: value for name, value in zip(header, values) if value != ""}
+
+
+async def parse_import(chunks, fmt: str):
+    # Yields (line number, TaskImportItem or error message).
+    records = _ndjson_records(chunks) if fmt == "ndjson" else _csv_records(chunks)
+    async for line_no, record in records:
+        if not isinstance(record, dict):
+            yield line_no, "Invalid JSON object"
+            continue
+        try:
+            yield line_no, TaskImportItem.model_validate(record)
+        except ValidationError as exc:
+            yield line_no, "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors()
+            )
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db import new_session
+from backend.metrics import timed
+
+DB_WRITE_QUEUE = os.getenv("DB_WRITE_QUEUE", "1") == "1"
+DB_WRITE_BATCH = int(os.getenv("DB_WRITE_BATCH", "64"))
+
+
+class WriteQueue:
+    """Serializes writes through one task and commits them in groups.
+
+    Every queued operation is an ``async def op(session)`` that executes its
+    statements without committing. Operations that pile up while a commit is
+    in flight are applied in one transaction; if any of them fails the batch
+    is rolled back and replayed one operation per transaction.
+    """
+
+    def __init__(self, max_batch: int):
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def reset(self):
+        # Forgets the queue and task of a parent process after fork.
+        self._queue = None
+        self._task = None
+
+    async def stop(self):
+        if self.running:
+            self._queue.put_nowait(None)
+            await self._task
+        self._task = None
+
+    async def submit(self, operation):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    await self._commit(batch)
+                    return
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch):
+        batch = [(operation, future) for operation, future in batch if not future.cancelled()]
+        if not batch:
+            return
+        try:
+            results = await self._apply(batch)
+        except Exception as exc:
+            if len(batch) > 1:
+                # Replay one by one so that only the failing caller sees the error.
+                for item in batch:
+                    await self._commit([item])
+                return
+            if not batch[0][1].done():
+                batch[0][1].set_exception(exc)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _apply(self, batch) -> list:
+        async with new_session() as session:
+            await session.connection(execution_options={"sqlite_begin_immediate": True})
+            results = [await operation(session) for operation, _ in batch]
+            await session.commit()
+        return results
+
+
+write_queue = WriteQueue(DB_WRITE_BATCH)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=write_queue.reset)
+
+
+async def run_write(session: AsyncSession, operation):
+    # End the caller's read transaction first: its pooled connection would
+    # otherwise sit idle while the writer waits for one of its own.
+    await session.commit()
+    with timed("write"):
+        if write_queue.running:
+            return await write_queue.submit(operation)
+        # Without a running writer (scripts, tests) the caller's session is used.
+        await session.connection(execution_options={"sqlite_begin_immediate": True})
+        try:
+            result = await operation(session)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        return result
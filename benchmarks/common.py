@@ -0,0 +1,84 @@
+import asyncio
+import contextlib
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def prepare_environment(**env):
+    """Point the backend at a scratch directory; must run before importing it."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.update({key: str(value) for key, value in env.items()})
+    os.chdir(tempfile.mkdtemp(prefix="fufa-bench-"))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+@contextlib.asynccontextmanager
+async def app_client():
+    import httpx
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+async def register_and_login(client, email, password="bench-password"):
+    await client.post("/auth/register/", json={"email": email, "password": password})
+    response = await client.post("/auth/login/", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(*args, env=None, cwd=None):
+    """Run ``python -m backend.serve`` in a subprocess; returns (process, base_url)."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve", "--port", str(port),
+         "--log-level", "warning", *args],
+        cwd=cwd or tempfile.mkdtemp(prefix="fufa-bench-"),
+        env={**os.environ, "PYTHONPATH": ROOT, **(env or {})},
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(base_url, process, path="/docs", interval=0.2):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while process.poll() is None:
+            try:
+                return await client.get(path)
+            except httpx.TransportError:
+                await asyncio.sleep(interval)
+    raise RuntimeError("server exited during startup")
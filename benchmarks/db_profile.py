@@ -0,0 +1,85 @@
+"""Mixed read/write throughput of the repositories under an engine profile.
+
+    python -m benchmarks.db_profile --profile plain
+    python -m benchmarks.db_profile --profile production
+
+Add --write-queue to route writes through the group-commit writer, e.g. with
+--write-ratio 1 to compare pure write throughput across --concurrency.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import latency_summary, prepare_environment
+
+
+async def run(args):
+    from backend.db import engine, new_session
+    from backend.main import init_db
+    from backend.models import User
+    from backend.repositories import TaskRepository
+    from backend.writer import write_queue
+
+    await init_db()
+    async with new_session() as session:
+        session.add_all(User(email=f"user{i}@example.com", password_hash="x") for i in range(args.users))
+        await session.commit()
+    if args.write_queue:
+        write_queue.start()
+
+    reads, writes, errors = [], [], 0
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            user_id = rng.randint(1, args.users)
+            t0 = time.perf_counter()
+            try:
+                async with new_session() as session:
+                    if rng.random() < args.write_ratio:
+                        await TaskRepository.create_task(session, user_id=user_id, title="bench")
+                        writes.append(time.perf_counter() - t0)
+                    else:
+                        await TaskRepository.get_user_tasks(session, user_id=user_id, limit=50)
+                        reads.append(time.perf_counter() - t0)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    await write_queue.stop()
+    await engine.dispose()
+
+    print(json.dumps({
+        "profile": args.profile,
+        "write_queue": args.write_queue,
+        "write_batches": write_queue.batches,
+        "concurrency": args.concurrency,
+        "write_ratio": args.write_ratio,
+        "ops_per_s": (len(reads) + len(writes)) / elapsed,
+        "errors": errors,
+        "reads": latency_summary(reads),
+        "writes": latency_summary(writes),
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=["plain", "production"], default="production")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--write-queue", action="store_true")
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    prepare_environment(DB_PROFILE=args.profile, DB_POOL_SIZE=args.concurrency)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Stream a large import and export through a real server and watch its memory.
+
+Starts uvicorn in a scratch directory, uploads N tasks as a streamed NDJSON
+body, exports them back as NDJSON and CSV and reports throughput together
+with the server's peak memory in each phase. RSS includes SQLite's page
+cache and mmap window (SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE, per connection),
+which grow up to their limits; pass smaller ones to see the rest stay flat:
+
+    python -m benchmarks.export_import --tasks 1000000
+    python -m benchmarks.export_import --tasks 1000000 --env SQLITE_MMAP_SIZE=0 SQLITE_CACHE_SIZE=-2000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import latency_summary, register_and_login, start_server, wait_until_ready
+
+
+def memory_mb(pid):
+    values = {}
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            name, _, rest = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                values[name] = int(rest.split()[0]) / 1024
+    return values
+
+
+class MemoryPeak:
+    """Samples the server's memory in the background while a phase runs."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = {}
+
+    async def _sample(self):
+        while True:
+            for name, value in memory_mb(self.pid).items():
+                self.peak[name] = max(self.peak.get(name, 0.0), value)
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        return False
+
+
+async def upload_body(tasks, chunk_rows=1000):
+    for start in range(0, tasks, chunk_rows):
+        yield b"".join(
+            b'{"title":"imported task %d","description":"row %d of the benchmark upload"}\n'
+            % (n, n)
+            for n in range(start, min(tasks, start + chunk_rows))
+        )
+
+
+async def probe(client, headers, samples):
+    # Another user's small writes and reads while the import runs.
+    while True:
+        t0 = time.perf_counter()
+        response = await client.post("/tasks/", json={"title": "probe"}, headers=headers)
+        response.raise_for_status()
+        await client.get("/tasks/summary", headers=headers)
+        samples.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.05)
+
+
+async def run(args, base_url, pid):
+    import httpx
+
+    report = {"tasks": args.tasks, "env": args.env, "startup_mb": memory_mb(pid)}
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        headers = await register_and_login(client, "export@example.com")
+        probe_headers = await register_and_login(client, "probe@example.com")
+
+        samples = []
+        probing = asyncio.create_task(probe(client, probe_headers, samples))
+        async with MemoryPeak(pid) as memory:
+            t0 = time.perf_counter()
+            response = await client.post(
+                "/tasks/import", content=upload_body(args.tasks), headers=headers
+            )
+            response.raise_for_status()
+            elapsed = time.perf_counter() - t0
+        probing.cancel()
+        report["import"] = {
+            "concurrent_create_and_summary": latency_summary(samples),
+            "imported": response.json()["imported"],
+            "seconds": elapsed,
+            "rows_per_second": args.tasks / elapsed,
+            "peak_mb": memory.peak,
+        }
+
+        for fmt in ("ndjson", "csv"):
+            rows = size = 0
+            async with MemoryPeak(pid) as memory:
+                t0 = time.perf_counter()
+                async with client.stream(
+                    "GET", "/tasks/export", params={"format": fmt}, headers=headers
+                ) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        rows += chunk.count(b"\n")
+                elapsed = time.perf_counter() - t0
+            report[f"export_{fmt}"] = {
+                "lines": rows,
+                "megabytes": size / 1e6,
+                "seconds": elapsed,
+                "rows_per_second": rows / elapsed,
+                "peak_mb": memory.peak,
+            }
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--env", nargs="*", default=[], help="NAME=VALUE settings for the server")
+    args = parser.parse_args()
+
+    process, base_url = start_server(env=dict(item.split("=", 1) for item in args.env))
+    try:
+        asyncio.run(wait_until_ready(base_url, process))
+        asyncio.run(run(args, base_url, process.pid))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
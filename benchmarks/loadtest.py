@@ -0,0 +1,265 @@
+"""HTTP load test over a library of scenarios, with a regression check.
+
+Drives backend.main:app in-process through httpx's ASGI transport by default,
+a real server started with backend.serve with --server, or an already
+running deployment with --url. Each scenario runs --concurrency clients for
+--seconds and reports throughput with p50/p95/p99 latency per operation:
+
+    python -m benchmarks.loadtest --output results.json
+    python -m benchmarks.loadtest --server --workers 2 --scenarios list_reads mixed_crud
+    python -m benchmarks.loadtest --baseline results.json --tolerance 0.2
+
+With --baseline the run fails (exit status 1) when a scenario's throughput
+drops, or its p95 rises, by more than --tolerance compared with the file.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from benchmarks.common import (
+    app_client,
+    latency_summary,
+    prepare_environment,
+    register_and_login,
+    start_server,
+    wait_until_ready,
+)
+
+PASSWORD = "bench-password"
+
+
+@dataclass
+class Scenario:
+    description: str
+    # setup(client, name, args) -> state shared by the scenario's clients
+    setup: Callable[..., Awaitable]
+    # step(client, state, rng) -> response of one measured operation
+    step: Callable[..., Awaitable]
+
+
+async def _users(client, name, count, tasks=0):
+    users = []
+    for n in range(count):
+        headers = await register_and_login(client, f"{name}{n}@example.com", PASSWORD)
+        ids = []
+        for start in range(0, tasks, 100):
+            response = await client.post(
+                "/tasks/bulk",
+                json={"items": [{"title": f"{name} task {i}"} for i in range(start, min(tasks, start + 100))]},
+                headers=headers,
+            )
+            response.raise_for_status()
+            ids += [result["id"] for result in response.json()["results"]]
+        users.append({"email": f"{name}{n}@example.com", "headers": headers, "ids": ids})
+    return users
+
+
+async def setup_accounts(client, name, args):
+    return await _users(client, name, args.users)
+
+
+async def setup_with_tasks(client, name, args):
+    return await _users(client, name, args.users, tasks=args.tasks)
+
+
+async def login(client, users, rng):
+    user = rng.choice(users)
+    return await client.post("/auth/login/", json={"email": user["email"], "password": PASSWORD})
+
+
+async def list_tasks(client, users, rng):
+    user = rng.choice(users)
+    params = {"limit": 50}
+    if rng.random() < 0.3:
+        params["is_done"] = rng.random() < 0.5
+    return await client.get("/tasks/", params=params, headers=user["headers"])
+
+
+async def toggle_task(client, users, rng):
+    user = rng.choice(users)
+    task_id = rng.choice(user["ids"])
+    return await client.put(
+        f"/tasks/{task_id}/", json={"is_done": rng.random() < 0.5}, headers=user["headers"]
+    )
+
+
+async def mixed_crud(client, users, rng):
+    user = rng.choice(users)
+    roll = rng.random()
+    if roll < 0.4 or not user["ids"]:
+        return await client.get("/tasks/", params={"limit": 50}, headers=user["headers"])
+    if roll < 0.7:
+        response = await client.post("/tasks/", json={"title": "mixed"}, headers=user["headers"])
+        if response.status_code == 200:
+            user["ids"].append(response.json()["id"])
+        return response
+    if roll < 0.9:
+        return await client.put(
+            f"/tasks/{rng.choice(user['ids'])}/", json={"title": "renamed"}, headers=user["headers"]
+        )
+    task_id = user["ids"].pop(rng.randrange(len(user["ids"])))
+    return await client.delete(f"/tasks/{task_id}/", headers=user["headers"])
+
+
+async def logout_churn(client, users, rng):
+    # A session's whole life: log in, read, log out, get turned away.
+    user = rng.choice(users)
+    response = await login(client, [user], rng)
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    (await client.get("/tasks/summary", headers=headers)).raise_for_status()
+    (await client.post("/auth/logout/", headers=headers)).raise_for_status()
+    response = await client.get("/tasks/summary", headers=headers)
+    if response.status_code != 401:
+        raise RuntimeError(f"revoked token got {response.status_code}")
+    return response
+
+
+SCENARIOS = {
+    "login_storm": Scenario("POST /auth/login/ (bcrypt bound)", setup_accounts, login),
+    "list_reads": Scenario("GET /tasks/ pages, some filtered by is_done", setup_with_tasks, list_tasks),
+    "toggle_writes": Scenario("PUT /tasks/{id}/ flipping is_done", setup_with_tasks, toggle_task),
+    "mixed_crud": Scenario("40% list, 30% create, 20% update, 10% delete", setup_with_tasks, mixed_crud),
+    "logout_churn": Scenario("login, read, logout, rejected read", setup_accounts, logout_churn),
+}
+
+
+async def run_scenario(client, name, scenario, args):
+    state = await scenario.setup(client, name, args)
+    samples, errors = [], 0
+    stop_at = 0.0
+
+    async def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                response = await scenario.step(client, state, rng)
+                failed = response.status_code >= 500
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - t0
+            if measuring:
+                samples.append(elapsed)
+                errors += failed
+
+    measuring = False
+    stop_at = time.perf_counter() + args.warmup
+    await asyncio.gather(*(worker(-n) for n in range(args.concurrency)))
+
+    measuring = True
+    started = time.perf_counter()
+    stop_at = started + args.seconds
+    await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "description": scenario.description,
+        "concurrency": args.concurrency,
+        "seconds": elapsed,
+        "throughput": len(samples) / elapsed,
+        "errors": errors,
+        **latency_summary(samples),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            found.append(f"{name}: throughput {previous['throughput']:.1f} -> {current['throughput']:.1f}/s")
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current["errors"] > previous["errors"]:
+            found.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return found
+
+
+@contextlib.asynccontextmanager
+async def http_client(base_url):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        yield client
+
+
+async def run(args, base_url=None):
+    client_context = http_client(base_url) if base_url else app_client()
+    results = {
+        "mode": "server" if args.server else "url" if args.url else "in-process",
+        "python": platform.python_version(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scenarios": {},
+    }
+    async with client_context as client:
+        for name in args.scenarios:
+            report = await run_scenario(client, name, SCENARIOS[name], args)
+            results["scenarios"][name] = report
+            print(
+                f"{name:14} {report['throughput']:9.1f} req/s  p50 {report['p50_ms']:7.2f}  "
+                f"p95 {report['p95_ms']:7.2f}  p99 {report['p99_ms']:7.2f} ms  errors {report['errors']}",
+                file=sys.stderr,
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per user for the task scenarios")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", action="store_true", help="start backend.serve in a subprocess")
+    target.add_argument("--url", help="load an already running server")
+    parser.add_argument("--workers", type=int, default=1, help="server workers with --server")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    # The in-process run moves into a scratch directory.
+    output = args.output and os.path.abspath(args.output)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+
+    if args.server:
+        process, base_url = start_server("--workers", str(args.workers))
+        try:
+            asyncio.run(wait_until_ready(base_url, process))
+            results = asyncio.run(run(args, base_url))
+        finally:
+            process.terminate()
+            process.wait()
+    elif args.url:
+        results = asyncio.run(run(args, args.url))
+    else:
+        prepare_environment()
+        results = asyncio.run(run(args))
+
+    print(json.dumps(results, indent=2))
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+    if baseline_path:
+        with open(baseline_path) as baseline:
+            found = regressions(results, json.load(baseline), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
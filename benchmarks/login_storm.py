@@ -0,0 +1,70 @@
+"""p99 of GET /tasks/ while other clients hammer /auth/login/.
+
+Compare inline hashing with the worker pool:
+
+    python -m benchmarks.login_storm --workers 0
+    python -m benchmarks.login_storm --workers 4
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import app_client, latency_summary, prepare_environment, register_and_login
+
+
+async def run(args):
+    async with app_client() as client:
+        headers = await register_and_login(client, "reader@example.com")
+        await register_and_login(client, "storm@example.com")
+        for i in range(args.tasks):
+            await client.post("/tasks/", json={"title": f"task {i}"}, headers=headers)
+
+        stop = asyncio.Event()
+        logins = 0
+
+        async def login_loop():
+            nonlocal logins
+            while not stop.is_set():
+                await client.post(
+                    "/auth/login/",
+                    json={"email": "storm@example.com", "password": "bench-password"},
+                )
+                logins += 1
+
+        stormers = [asyncio.create_task(login_loop()) for _ in range(args.logins)]
+        samples = []
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            response = await client.get("/tasks/", headers=headers)
+            samples.append(time.perf_counter() - t0)
+            response.raise_for_status()
+            await asyncio.sleep(args.interval)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*stormers, return_exceptions=True)
+
+    result = {
+        "password_pool_workers": args.workers,
+        "concurrent_logins": args.logins,
+        "logins_per_s": logins / elapsed,
+        "list_tasks": latency_summary(samples),
+    }
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="PASSWORD_POOL_WORKERS (0 = inline)")
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login loops")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+    prepare_environment(PASSWORD_POOL_WORKERS=args.workers, PASSWORD_POOL_MAX_PENDING=1024)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Fail if an endpoint runs more SQL statements than its budget.
+
+Every request starts with empty in-process caches, so the counts are the
+worst case a cold worker sees. Statements the write queue runs on behalf of
+the request are counted too:
+
+    python -m benchmarks.query_budgets
+"""
+import asyncio
+import sys
+
+from benchmarks.common import app_client, prepare_environment, register_and_login
+
+# (method, path, body, maximum statements)
+BUDGETS = [
+    ("GET", "/tasks/", None, 3),
+    ("GET", "/tasks/?is_done=true&limit=10", None, 3),
+    ("GET", "/tasks/summary", None, 2),
+    ("GET", "/tasks/search?q=budget", None, 2),
+    ("GET", "/tasks/changes?since=0", None, 3),
+    ("POST", "/tasks/", {"title": "budget task"}, 3),
+    ("PUT", "/tasks/1/", {"is_done": True}, 3),
+    ("GET", "/auth/profile/", None, 1),
+    ("GET", "/auth/users/?limit=50&with_task_counts=true", None, 2),
+]
+
+
+def clear_caches():
+    from backend.cache import principal_cache, task_list_cache, token_versions
+
+    for cache in (principal_cache, token_versions, task_list_cache):
+        cache.clear()
+
+
+async def run():
+    from backend.sqlstats import QueryBudgetExceeded, query_budget
+
+    failures = 0
+    async with app_client() as client:
+        headers = await register_and_login(client, "admin@example.com", "budget-admin")
+        for n in range(20):
+            await client.post("/tasks/", json={"title": f"budget task {n}"}, headers=headers)
+
+        for method, path, body, limit in BUDGETS:
+            clear_caches()
+            try:
+                with query_budget(limit) as budget:
+                    response = await client.request(method, path, json=body, headers=headers)
+                status = "ok"
+            except QueryBudgetExceeded as exc:
+                status, failures = "FAIL", failures + 1
+                print(exc, file=sys.stderr)
+            print(f"{status:4} {method} {path}: {budget.count}/{limit} ({response.status_code})")
+    return 1 if failures else 0
+
+
+def main():
+    prepare_environment(ADMIN_EMAIL="admin@example.com", ADMIN_PASSWORD="budget-admin")
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
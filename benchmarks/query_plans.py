@@ -0,0 +1,153 @@
+"""Fail if any repository query falls back to a full table scan.
+
+Runs every repository method against a seeded scratch database, records the
+SQL it emits and checks ``EXPLAIN QUERY PLAN`` for each statement:
+
+    python -m benchmarks.query_plans
+
+tests/test_query_plans.py runs the same check under pytest.
+"""
+import asyncio
+import re
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import prepare_environment
+
+# Method name -> tables it is allowed to scan on purpose.
+ALLOWED_SCANS = {
+    "TaskRepository.check_task_counters": {"task_counters"},
+}
+
+# Method name -> table it must read by rowid: a handful of ids should never
+# walk the user's index instead.
+PRIMARY_KEY_LOOKUPS = {
+    "TaskRepository.update_tasks": "tasks",
+    "TaskRepository.delete_tasks": "tasks",
+}
+
+PLANNED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+SCAN = re.compile(r"^SCAN ([A-Za-z_]\w*)\b(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE)")
+
+
+async def drain(batches):
+    async for _ in batches:
+        pass
+
+
+def repository_calls(user_id, task_id):
+    from backend.repositories import RevokedTokenRepository, TaskRepository, UserRepository
+
+    return [
+        ("UserRepository.get_user_by_email", lambda s: UserRepository.get_user_by_email(s, "user0@example.com")),
+        ("UserRepository.user_exists", lambda s: UserRepository.user_exists(s, "user0@example.com")),
+        ("UserRepository.create_user", lambda s: UserRepository.create_user(s, "plan-check@example.com", "plan-check")),
+        ("UserRepository.get_token_version", lambda s: UserRepository.get_token_version(s, user_id)),
+        ("UserRepository.bump_token_version", lambda s: UserRepository.bump_token_version(s, user_id)),
+        ("UserRepository.get_users", lambda s: UserRepository.get_users(s, limit=100, after="user1@example.com")),
+        ("UserRepository.get_users(prefix, counts)", lambda s: UserRepository.get_users(s, limit=100, email_prefix="user1", with_task_counts=True)),
+        ("UserRepository.stream_users", lambda s: drain(UserRepository.stream_users(s, with_task_counts=True))),
+        ("TaskRepository.get_user_tasks", lambda s: TaskRepository.get_user_tasks(s, user_id)),
+        ("TaskRepository.get_user_tasks(is_done)", lambda s: TaskRepository.get_user_tasks(s, user_id, is_done=True)),
+        ("TaskRepository.get_user_tasks(page)", lambda s: TaskRepository.get_user_tasks(s, user_id, limit=100, after=(datetime(2000, 1, 1), 0))),
+        ("TaskRepository.get_user_tasks(is_done, page)", lambda s: TaskRepository.get_user_tasks(s, user_id, is_done=False, limit=100, after=(datetime(2000, 1, 1), 0))),
+        ("TaskRepository.get_user_task_rows", lambda s: TaskRepository.get_user_task_rows(s, user_id, is_done=True, limit=100)),
+        ("TaskRepository.get_tasks_version", lambda s: TaskRepository.get_tasks_version(s, user_id)),
+        ("TaskRepository.stream_user_tasks", lambda s: drain(TaskRepository.stream_user_tasks(s, user_id))),
+        ("TaskRepository.create_task", lambda s: TaskRepository.create_task(s, user_id, "created")),
+        ("TaskRepository.create_tasks", lambda s: TaskRepository.create_tasks(s, user_id, [{"title": "bulk 1"}, {"title": "bulk 2"}])),
+        ("TaskRepository.import_tasks", lambda s: TaskRepository.import_tasks(s, user_id, [{"title": "imported"}])),
+        ("TaskRepository.search_tasks", lambda s: TaskRepository.search_tasks(s, user_id, ["task"], limit=20)),
+        ("TaskRepository.get_task_summary", lambda s: TaskRepository.get_task_summary(s, user_id)),
+        ("TaskRepository.check_task_counters", lambda s: TaskRepository.check_task_counters(s)),
+        ("TaskRepository.get_changes", lambda s: TaskRepository.get_changes(s, user_id, since=1)),
+        ("TaskRepository.update_task", lambda s: TaskRepository.update_task(s, task_id, user_id, {"is_done": True})),
+        ("TaskRepository.update_tasks", lambda s: TaskRepository.update_tasks(s, user_id, [{"id": task_id + 20, "is_done": True}, {"id": task_id + 40, "is_done": True}])),
+        ("TaskRepository.delete_task", lambda s: TaskRepository.delete_task(s, task_id, user_id)),
+        ("TaskRepository.delete_tasks", lambda s: TaskRepository.delete_tasks(s, user_id, [task_id + 20, task_id + 40])),
+        ("TaskRepository.purge_tombstones", lambda s: TaskRepository.purge_tombstones(s, datetime.utcnow() + timedelta(days=1))),
+        ("RevokedTokenRepository.revoke_token", lambda s: RevokedTokenRepository.revoke_token(s, "plan-check", datetime.utcnow() + timedelta(minutes=5))),
+        ("RevokedTokenRepository.is_token_revoked", lambda s: RevokedTokenRepository.is_token_revoked(s, "plan-check")),
+        ("RevokedTokenRepository.load_revoked_tokens", lambda s: RevokedTokenRepository.load_revoked_tokens(s)),
+        ("RevokedTokenRepository.purge_expired_tokens", lambda s: RevokedTokenRepository.purge_expired_tokens(s)),
+    ]
+
+
+async def seed(session, users=20, tasks_per_user=50):
+    """Returns a seeded user's id and the id of one of their tasks, followed
+    by two more of that user's tasks at +20 and +40."""
+    from backend.models import Task, User
+
+    owners = [User(email=f"user{i}@example.com", password_hash="x") for i in range(users)]
+    session.add_all(owners)
+    await session.flush()
+    tasks = [
+        Task(title=f"task {n}", user_id=owners[n % users].id_user, is_done=n % 3 == 0)
+        for n in range(users * tasks_per_user)
+    ]
+    session.add_all(tasks)
+    await session.flush()
+    await session.commit()
+    return owners[1].id_user, tasks[users * 2 + 1].id
+
+
+async def check_plans():
+    """Yield (method, plan lines, unexpected scans, statement) per statement."""
+    from sqlalchemy import event
+    from backend.cache import revoked_tokens
+    from backend.db import engine, new_session
+    from backend.main import init_db
+
+    await init_db()
+    async with new_session() as session:
+        user_id, task_id = await seed(session)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        for name, call in repository_calls(user_id, task_id):
+            captured.clear()
+            revoked_tokens.loaded = False
+            async with new_session() as session:
+                await call(session)
+            statements = [item for item in captured if item[0].lstrip().upper().startswith(PLANNED)]
+            async with engine.connect() as conn:
+                for statement, parameters in statements:
+                    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                    plan = [row[-1] for row in result] if result.returns_rows else []
+                    scans = {m.group(1) for line in plan if (m := SCAN.match(line))}
+                    table = PRIMARY_KEY_LOOKUPS.get(name)
+                    if table and any(
+                        re.match(rf"(?:SEARCH|SCAN) {table}\b", line) and "INTEGER PRIMARY KEY" not in line
+                        for line in plan
+                    ):
+                        scans.add(f"{table} (not by primary key)")
+                    yield name, plan, scans - ALLOWED_SCANS.get(name, set()), statement
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        await engine.dispose()
+
+
+async def run():
+    failures = []
+    async for name, plan, scans, statement in check_plans():
+        print(f"{'FAIL' if scans else 'ok':4} {name}: {' | '.join(plan)}")
+        if scans:
+            failures.append((name, statement))
+
+    for name, statement in failures:
+        print(f"\n{name} scans a table:\n{statement}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def main():
+    prepare_environment()
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
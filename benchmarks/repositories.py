@@ -0,0 +1,165 @@
+"""Time TaskRepository and UserRepository methods across database sizes.
+
+For every size a database is seeded with benchmarks.seed (kept in --data-dir
+and reused by later runs), then a fresh interpreter pointed at it times each
+repository method the way a request calls it: one session per call, no
+caches warmed beyond the first call. Tasks are skewed over users, so the
+"heavy" user owns the most tasks and the "typical" one a median share.
+update_task and delete_task change the seeded files a little on every run:
+
+    python -m benchmarks.repositories --sizes 10000 100000 1000000 --users 1000
+
+The table on stderr shows p50 per method and size plus the growth from the
+smallest to the largest size; the JSON on stdout has the full numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, latency_summary
+
+
+def method_calls(user_count, heavy, typical, victim, task_ids, victim_ids, jtis):
+    from backend.cache import revoked_tokens
+    from backend.repositories import RevokedTokenRepository, TaskRepository, UserRepository
+
+    rng = random.Random(1)
+
+    async def revoked_from_db(session):
+        revoked_tokens.loaded = False
+        return await RevokedTokenRepository.is_token_revoked(session, rng.choice(jtis))
+
+    async def revoked_in_memory(session):
+        if not revoked_tokens.loaded:
+            await RevokedTokenRepository.load_revoked_tokens(session)
+        return await RevokedTokenRepository.is_token_revoked(session, rng.choice(jtis))
+
+    return {
+        "get_user_tasks(limit=100, heavy)": lambda s: TaskRepository.get_user_tasks(s, heavy, limit=100),
+        "get_user_tasks(limit=100)": lambda s: TaskRepository.get_user_tasks(s, typical, limit=100),
+        "get_user_tasks(is_done=True, limit=100, heavy)": lambda s: TaskRepository.get_user_tasks(s, heavy, is_done=True, limit=100),
+        "get_user_tasks(is_done=False, limit=100)": lambda s: TaskRepository.get_user_tasks(s, typical, is_done=False, limit=100),
+        "get_user_tasks(all)": lambda s: TaskRepository.get_user_tasks(s, typical),
+        "get_user_tasks(is_done=True, all)": lambda s: TaskRepository.get_user_tasks(s, typical, is_done=True),
+        "update_task": lambda s: TaskRepository.update_task(
+            s, rng.choice(task_ids), typical, {"is_done": rng.random() < 0.5}
+        ),
+        "delete_task": lambda s: TaskRepository.delete_task(s, victim_ids.pop(), victim),
+        "get_user_by_email": lambda s: UserRepository.get_user_by_email(
+            s, f"user{rng.randint(1, user_count)}@example.com"
+        ),
+        "is_token_revoked(db)": revoked_from_db,
+        "is_token_revoked(memory)": revoked_in_memory,
+    }
+
+
+async def measure(args):
+    from sqlalchemy import func, select
+    from backend.db import engine, new_session
+    from backend.models import RevokedToken, Task, User
+
+    async with new_session() as session:
+        user_count = await session.scalar(select(func.count()).select_from(User))
+        task_count = await session.scalar(select(func.count()).select_from(Task))
+        per_user = (
+            await session.execute(
+                select(Task.user_id, func.count()).group_by(Task.user_id).order_by(func.count().desc())
+            )
+        ).all()
+        # Deletes come from the second heaviest user, who has tasks to spare.
+        heavy, victim, typical = per_user[0][0], per_user[1][0], per_user[len(per_user) // 2][0]
+        task_ids = list(await session.scalars(select(Task.id).where(Task.user_id == typical)))
+        victim_ids = list(await session.scalars(select(Task.id).where(Task.user_id == victim)))
+        existing = list(await session.scalars(select(RevokedToken.jti).limit(args.repeat)))
+
+    jtis = existing + [f"missing-{n}" for n in range(len(existing) or 1)]
+    calls = method_calls(user_count, heavy, typical, victim, task_ids, victim_ids, jtis)
+    results = {}
+    for name, call in calls.items():
+        repeat = args.repeat
+        if name == "delete_task":
+            repeat = min(repeat, len(victim_ids) - args.warmup)
+        samples = []
+        for n in range(repeat + args.warmup):
+            async with new_session() as session:
+                t0 = time.perf_counter()
+                await call(session)
+                elapsed = time.perf_counter() - t0
+            if n >= args.warmup:
+                samples.append(elapsed)
+        results[name] = latency_summary(samples)
+    await engine.dispose()
+    return {
+        "tasks": task_count,
+        "users": user_count,
+        "tasks_of_heavy_user": per_user[0][1],
+        "tasks_of_typical_user": per_user[len(per_user) // 2][1],
+        "methods": results,
+    }
+
+
+def seeded_database(args, size):
+    path = os.path.join(args.data_dir, f"tasks-{args.users}u-{size}t-skew{args.skew}.db")
+    if not os.path.exists(path):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.seed", "--db", path, "--users", str(args.users),
+             "--tasks", str(size), "--revoked", str(args.revoked), "--skew", str(args.skew)],
+            check=True, cwd=ROOT, stdout=subprocess.DEVNULL,
+        )
+    return path
+
+
+def run_child(args, path):
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.repositories", "--child", path,
+         "--repeat", str(args.repeat), "--warmup", str(args.warmup)],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{path}", "SLOW_QUERY_MS": "0"},
+    )
+    return json.loads(output)
+
+
+def print_table(reports):
+    sizes = [report["tasks"] for report in reports]
+    width = max(len(name) for name in reports[0]["methods"])
+    header = "".join(f"{size:>12,}" for size in sizes)
+    print(f"{'p50 ms / tasks':{width}}{header}      growth", file=sys.stderr)
+    for name in reports[0]["methods"]:
+        values = [report["methods"][name]["p50_ms"] for report in reports]
+        growth = values[-1] / values[0] if values[0] else 0.0
+        cells = "".join(f"{value:12.3f}" for value in values)
+        print(f"{name:{width}}{cells}  {growth:9.2f}x", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--revoked", type=int, default=10000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "fufa-bench-data"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        print(json.dumps(asyncio.run(measure(args))))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    reports = [run_child(args, seeded_database(args, size)) for size in args.sizes]
+    print_table(reports)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Task search latency: FTS5 index versus a LIKE scan over the same rows.
+
+    python -m benchmarks.search --users 100 --tasks 200000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from benchmarks.common import latency_summary, percentile, prepare_environment
+
+SYLLABLES = "ba ko ri te mu sa lo ne vi da pe ru mi to ka".split()
+VOCABULARY = 20000
+
+
+def make_words(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def random_text(rng, words, cum_weights, count):
+    # Zipf-like word frequencies, as in natural text.
+    return " ".join(rng.choices(words, cum_weights=cum_weights, k=count))
+
+
+def make_queries(rng, words):
+    # Frequent, mid-frequency and rare words, two-word queries and prefixes.
+    queries = [words[0], words[10], words[200], words[5000], words[-1]]
+    queries += [f"{words[3]} {words[40]}", f"{words[100]} {words[900]}"]
+    queries += [words[7][:3], words[300][:4]]
+    return queries
+
+
+async def seed(args, words):
+    from backend.db import new_session
+    from backend.models import User
+    from backend.repositories import TaskRepository
+
+    rng = random.Random(42)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    per_user = args.tasks // args.users
+    async with new_session() as session:
+        session.add_all(
+            User(id_user=n, email=f"user{n}@example.com", password_hash="x")
+            for n in range(1, args.users + 1)
+        )
+        await session.commit()
+        for user_id in range(1, args.users + 1):
+            for start in range(0, per_user, 1000):
+                items = [
+                    {
+                        "title": random_text(rng, words, cum_weights, 4),
+                        "description": random_text(rng, words, cum_weights, 15),
+                    }
+                    for _ in range(min(1000, per_user - start))
+                ]
+                await TaskRepository.create_tasks(session, user_id, items)
+
+
+async def like_search(session, user_id, terms, limit):
+    from sqlalchemy import or_, select
+    from backend.models import Task
+
+    stmt = select(Task.id, Task.title, Task.description, Task.is_done, Task.created_at).where(
+        Task.user_id == user_id
+    )
+    for term in terms:
+        pattern = f"%{term}%"
+        stmt = stmt.where(or_(Task.title.ilike(pattern), Task.description.ilike(pattern)))
+    # Newest first: without an order the scan could stop at the first matches,
+    # which a real endpoint cannot do.
+    result = await session.execute(stmt.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit))
+    return result.all()
+
+
+async def measure(args, queries, search):
+    from backend.db import new_session
+    from backend.repositories.task import search_terms
+
+    rng = random.Random(7)
+    samples = {query: [] for query in queries}
+    async with new_session() as session:
+        for _ in range(args.requests):
+            query = rng.choice(queries)
+            user_id = rng.randint(1, args.users)
+            t0 = time.perf_counter()
+            await search(session, user_id, search_terms(query), args.limit)
+            samples[query].append(time.perf_counter() - t0)
+    return {
+        "overall": latency_summary([sample for values in samples.values() for sample in values]),
+        "p50_ms_by_query": {query: percentile(values, 50) * 1000 for query, values in samples.items()},
+    }
+
+
+async def match_counts(queries):
+    from sqlalchemy import text
+    from backend.db import new_session
+    from backend.repositories.task import search_terms
+
+    counts = {}
+    async with new_session() as session:
+        for query in queries:
+            expression = " ".join(f'"{term}"*' for term in search_terms(query))
+            result = await session.execute(
+                text("SELECT count(*) FROM tasks_fts WHERE tasks_fts MATCH :q"), {"q": expression}
+            )
+            counts[query] = result.scalar()
+    return counts
+
+
+async def run(args):
+    from backend.main import init_db
+    from backend.repositories import TaskRepository
+
+    await init_db()
+    words = make_words(random.Random(1))
+    queries = make_queries(random.Random(2), words)
+    t0 = time.perf_counter()
+    await seed(args, words)
+    seeded = time.perf_counter() - t0
+
+    async def fts_search(session, user_id, terms, limit):
+        return await TaskRepository.search_tasks(session, user_id, terms, limit=limit)
+
+    print(json.dumps({
+        "users": args.users,
+        "tasks": args.tasks,
+        "seed_seconds": seeded,
+        "matches_by_query": await match_counts(queries),
+        "fts": await measure(args, queries, fts_search),
+        "like": await measure(args, queries, like_search),
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    prepare_environment()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Bulk-generate users, tasks and revoked tokens into a scratch SQLite file.
+
+The schema comes from the app's own init_db. The rows are then written with
+the sqlite3 module in large executemany batches while the tasks indexes and
+triggers are dropped; afterwards the indexes are rebuilt in one pass, the
+FTS index and task counters are rebuilt from the table and ANALYZE runs, so
+the file looks like one that grew through the API:
+
+    python -m benchmarks.seed --db /tmp/tasks.db --users 10000 --tasks 5000000
+
+Every user is userN@example.com with the password "bench-password". Tasks
+are spread over users with a Zipf-like skew (--skew 0 spreads them evenly).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import secrets
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import ROOT
+
+PASSWORD = "bench-password"
+BATCH = 50000
+WORDS = (
+    "buy call write fix review plan send book check clean update prepare read "
+    "pay order move test deploy report meeting invoice groceries design draft"
+).split()
+
+
+def create_schema(path):
+    # backend.db reads DATABASE_URL at import time.
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from backend.db import engine
+    from backend.main import init_db
+    from backend.security import hash_password
+
+    async def run():
+        await init_db()
+        await engine.dispose()
+
+    asyncio.run(run())
+    return hash_password(PASSWORD)
+
+
+def task_owners(rng, users, tasks, skew):
+    if skew <= 0:
+        weights = None
+    else:
+        weights = list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, users + 1)))
+    for start in range(0, tasks, BATCH):
+        count = min(BATCH, tasks - start)
+        if weights is None:
+            yield [rng.randrange(1, users + 1) for _ in range(count)]
+        else:
+            yield rng.choices(range(1, users + 1), cum_weights=weights, k=count)
+
+
+def task_rows(rng, titles, owners, first_created, step, done_ratio, offset):
+    random_ = rng.random
+    for n, user_id in enumerate(owners, start=offset):
+        created = (first_created + step * n).isoformat(" ", "microseconds")
+        title = titles[n % len(titles)]
+        description = None if n % 3 else f"{title} before the end of the week"
+        yield (title, description, random_() < done_ratio, created, created, 0, user_id)
+
+
+def seed(path, users, tasks, revoked=0, done_ratio=0.3, skew=1.0, seed_value=1):
+    password_hash = create_schema(path)
+    from backend.migrations import REBUILD_TASK_COUNTERS
+
+    rng = random.Random(seed_value)
+    titles = [" ".join(rng.choices(WORDS, k=rng.randint(2, 5))) for _ in range(4093)]
+    timings = {}
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    started = time.perf_counter()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO users (email, password_hash, is_admin, token_version, tasks_version) "
+        "VALUES (?, ?, 0, 0, 0)",
+        ((f"user{n}@example.com", password_hash) for n in range(1, users + 1)),
+    )
+    conn.execute("COMMIT")
+    timings["users"] = time.perf_counter() - started
+
+    # Rebuilding indexes once is much faster than updating them per row.
+    saved = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = 'tasks' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ).fetchall()
+    for kind, name, _ in saved:
+        conn.execute(f"DROP {kind.upper()} {name}")
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    span = timedelta(days=365)
+    step = span / max(tasks, 1)
+    offset = 0
+    for owners in task_owners(rng, users, tasks, skew):
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO tasks (title, description, is_done, created_at, updated_at, revision, user_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            task_rows(rng, titles, owners, now - span, step, done_ratio, offset),
+        )
+        conn.execute("COMMIT")
+        offset += len(owners)
+    timings["tasks"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    conn.execute("BEGIN")
+    for kind, _, sql in sorted(saved, key=lambda item: item[0] != "index"):
+        conn.execute(sql)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone():
+        conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    for statement in REBUILD_TASK_COUNTERS:
+        conn.execute(statement)
+    conn.execute("COMMIT")
+    timings["indexes"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expires = (now + timedelta(days=1)).isoformat(" ", "microseconds")
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)",
+        ((secrets.token_urlsafe(12), expires) for _ in range(revoked)),
+    )
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    timings["revoked_and_analyze"] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite file to create (must not exist)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--revoked", type=int, default=10000)
+    parser.add_argument("--done-ratio", type=float, default=0.3)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of tasks per user")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+
+    path = os.path.abspath(args.db)
+    started = time.perf_counter()
+    timings = seed(
+        path, args.users, args.tasks, args.revoked, args.done_ratio, args.skew, args.seed
+    )
+    print(json.dumps({
+        "db": path,
+        "users": args.users,
+        "tasks": args.tasks,
+        "revoked": args.revoked,
+        "seconds": {**timings, "total": time.perf_counter() - started},
+        "megabytes": os.path.getsize(path) / 1e6,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Time from process start to the first answered request of backend.main:app.
+
+Starts uvicorn repeatedly, each time polling until the first request gets a
+response. "fresh" runs boot on an empty directory, so they create the schema
+and the admin user; "existing" runs reuse one database that was set up by a
+previous boot, like a worker restart or an autoscaling event. The import of
+backend.main alone is measured in a fresh interpreter as well:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT, start_server, wait_until_ready
+
+ENV = {"ADMIN_EMAIL": "admin@example.com", "ADMIN_PASSWORD": "startup-admin"}
+IMPORT_SNIPPET = (
+    "import time; t0 = time.perf_counter(); import backend.main; "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def time_to_first_request(cwd):
+    t0 = time.perf_counter()
+    process, base_url = start_server(env=ENV, cwd=cwd)
+    try:
+        # Any answer counts, a 401 included: the app is serving.
+        asyncio.run(wait_until_ready(base_url, process, path="/tasks/", interval=0.005))
+        return time.perf_counter() - t0
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_time():
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=tempfile.mkdtemp(prefix="fufa-bench-"),
+        env={"PYTHONPATH": ROOT, **ENV},
+        stderr=subprocess.DEVNULL,
+    )
+    return float(output.split()[-1])
+
+
+def summary(samples):
+    return {
+        "runs": len(samples),
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    fresh = [time_to_first_request(tempfile.mkdtemp(prefix="fufa-bench-")) for _ in range(args.runs)]
+    existing_dir = tempfile.mkdtemp(prefix="fufa-bench-")
+    time_to_first_request(existing_dir)
+    existing = [time_to_first_request(existing_dir) for _ in range(args.runs)]
+    imports = [import_time() for _ in range(args.runs)]
+    print(json.dumps({
+        "import_backend_main": summary(imports),
+        "first_request_fresh_db": summary(fresh),
+        "first_request_existing_db": summary(existing),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
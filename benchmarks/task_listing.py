@@ -0,0 +1,83 @@
+"""Per-row cost of listing tasks: ORM + pydantic versus plain rows + direct JSON.
+
+    python -m benchmarks.task_listing --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import prepare_environment
+
+
+def encode_like_fastapi(tasks):
+    from backend.schemas import TaskPage
+
+    page = TaskPage(items=tasks, next_cursor=None)
+    return json.dumps(
+        page.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = await func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings), body
+
+
+async def run(args):
+    from backend.db import new_session
+    from backend.encoding import json_bytes, orjson
+    from backend.main import init_db
+    from backend.models import User
+    from backend.repositories import TaskRepository
+
+    await init_db()
+    results = []
+    for user_id, size in enumerate(args.sizes, start=1):
+        async with new_session() as session:
+            session.add(User(id_user=user_id, email=f"user{user_id}@example.com", password_hash="x"))
+            await session.commit()
+            for start in range(0, size, 1000):
+                items = [
+                    {"title": f"Задача {n}", "description": None if n % 4 else "описание"}
+                    for n in range(start, min(size, start + 1000))
+                ]
+                await TaskRepository.create_tasks(session, user_id, items)
+
+        async def orm_path():
+            async with new_session() as session:
+                tasks = await TaskRepository.get_user_tasks(session, user_id, limit=size)
+                return encode_like_fastapi(tasks)
+
+        async def fast_path():
+            async with new_session() as session:
+                rows = await TaskRepository.get_user_task_rows(session, user_id, limit=size)
+                return json_bytes({"items": [row._asdict() for row in rows], "next_cursor": None})
+
+        orm_time, orm_body = await best_of(args.repeat, orm_path)
+        fast_time, fast_body = await best_of(args.repeat, fast_path)
+        results.append({
+            "rows": size,
+            "orm_us_per_row": orm_time / size * 1e6,
+            "fast_us_per_row": fast_time / size * 1e6,
+            "speedup": orm_time / fast_time,
+            "bytes_identical": orm_body == fast_body,
+        })
+    print(json.dumps({"encoder": "orjson" if orjson else "json", "results": results}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    prepare_environment()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
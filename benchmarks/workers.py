@@ -0,0 +1,107 @@
+"""Throughput of backend.serve with 1, 2, 4 and 8 workers on one SQLite database.
+
+Every worker count runs against the same database directory, so later runs
+see the rows written by earlier ones, just as workers sharing a deployment
+would. The load comes from several client processes so the generator is not
+the bottleneck; keep --clients plus the server workers at or below the
+machine's cores for numbers that mean something:
+
+    python -m benchmarks.workers --workers 1 2 4 8 --seconds 10 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import latency_summary, register_and_login, start_server, wait_until_ready
+
+
+async def prepare_users(base_url, users):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        return [await register_and_login(client, f"worker{n}@example.com") for n in range(users)]
+
+
+async def load(base_url, headers, connections, seconds, write_ratio, seed):
+    import httpx
+
+    rng = random.Random(seed)
+    samples, errors = [], 0
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    async def loop(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            auth = rng.choice(headers)
+            t0 = time.perf_counter()
+            if rng.random() < write_ratio:
+                response = await client.post("/tasks/", json={"title": "load"}, headers=auth)
+            else:
+                response = await client.get("/tasks/", params={"limit": 20}, headers=auth)
+            samples.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await asyncio.gather(*(loop(client) for _ in range(connections)))
+    return samples, errors, time.perf_counter() - started
+
+
+def client_process(job):
+    return asyncio.run(load(*job))
+
+
+def measure(args, workers, data_dir):
+    process, base_url = start_server(
+        "--workers", str(workers), env=dict(item.split("=", 1) for item in args.env), cwd=data_dir
+    )
+    try:
+        asyncio.run(wait_until_ready(base_url, process))
+        headers = asyncio.run(prepare_users(base_url, args.users))
+        per_client = max(1, args.connections // args.clients)
+        jobs = [
+            (base_url, headers, per_client, args.seconds, args.write_ratio, n)
+            for n in range(args.clients)
+        ]
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            results = pool.map(client_process, jobs)
+    finally:
+        process.terminate()
+        process.wait()
+
+    samples = [sample for part, _, _ in results for sample in part]
+    return {
+        "workers": workers,
+        # Each client measures its own window, so process startup is not counted.
+        "requests_per_second": sum(len(part) / elapsed for part, _, elapsed in results),
+        "errors": sum(errors for _, errors, _ in results),
+        "latency": latency_summary(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--connections", type=int, default=64, help="total open connections")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="load generator processes")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="share of POST /tasks/")
+    parser.add_argument("--env", nargs="*", default=[], help="NAME=VALUE settings for the server")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="fufa-bench-")
+    report = [measure(args, workers, data_dir) for workers in args.workers]
+    print(json.dumps({"cpu_count": os.cpu_count(), "runs": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
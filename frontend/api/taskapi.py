@@ -6,6 +6,8 @@ class TaskAPI:
     def __init__(self, base_url: str = "http://127.0.0.1:8000/tasks"):
         self.base_url = base_url
         self.session = requests.Session()
+        # (token, params) -> (etag, page) for conditional GETs of the task list
+        self._pages = {}
 
     def _get_headers(self, token: str):
         return {"Authorization": f"Bearer {token}"}
@@ -24,12 +26,29 @@ class TaskAPI:
     def get_tasks(self, token: str, is_done: bool = None):
         try:
             params = {"is_done": is_done} if is_done is not None else {}
-            response = self.session.get(
-                f"{self.base_url}/",
-                params=params,
-                headers=self._get_headers(token)
-            )
-            return response.json(), response.status_code
+            tasks = []
+            while True:
+                key = (token, tuple(sorted(params.items())))
+                headers = self._get_headers(token)
+                if key in self._pages:
+                    headers["If-None-Match"] = self._pages[key][0]
+                response = self.session.get(
+                    f"{self.base_url}/",
+                    params=params,
+                    headers=headers
+                )
+                if response.status_code == 304:
+                    page = self._pages[key][1]
+                elif response.status_code == 200:
+                    page = response.json()
+                    if "ETag" in response.headers:
+                        self._pages[key] = (response.headers["ETag"], page)
+                else:
+                    return response.json(), response.status_code
+                tasks.extend(page["items"])
+                if not page["next_cursor"]:
+                    return tasks, 200
+                params = {**params, "cursor": page["next_cursor"]}
         except requests.exceptions.RequestException:
             return None, "Connection error"
 
@@ -0,0 +1,15 @@
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    # backend.db creates its engine from DATABASE_URL when it is first
+    # imported, so tests import backend only after requesting this fixture.
+    # The engine is process-wide: every test of a run shares the database.
+    assert "backend.db" not in sys.modules, "backend was imported before database_url"
+    url = f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DATABASE_URL", url)
+        yield url
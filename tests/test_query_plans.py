@@ -0,0 +1,29 @@
+import asyncio
+import inspect
+
+
+def test_every_repository_method_is_checked(database_url):
+    from backend.repositories import RevokedTokenRepository, TaskRepository, UserRepository
+    from benchmarks.query_plans import repository_calls
+
+    checked = {name.split("(")[0] for name, _ in repository_calls(user_id=1, task_id=1)}
+    methods = {
+        f"{repository.__name__}.{name}"
+        for repository in (UserRepository, TaskRepository, RevokedTokenRepository)
+        for name, _ in inspect.getmembers(repository, inspect.isfunction)
+        if not name.startswith("_")
+    }
+    assert methods - checked == set()
+
+
+def test_repository_queries_do_not_scan_tables(database_url):
+    from benchmarks.query_plans import check_plans
+
+    async def collect():
+        return [
+            f"{name} scans {', '.join(sorted(scans))}:\n{statement}"
+            async for name, _, scans, statement in check_plans()
+            if scans
+        ]
+
+    assert asyncio.run(collect()) == []
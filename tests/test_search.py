@@ -0,0 +1,24 @@
+import asyncio
+
+
+def test_search_by_a_prefix_of_the_user_id_matches_only_text(database_url):
+    from benchmarks.common import app_client, register_and_login
+    from backend.db import engine, new_session
+    from backend.repositories import UserRepository
+
+    async def search():
+        async with app_client() as client:
+            headers = await register_and_login(client, "search@example.com", "search-password")
+            async with new_session() as session:
+                user = await UserRepository.get_user_by_email(session, "search@example.com")
+            prefix = str(user.id_user)[0]
+            for title in ("buy milk", "call the bank", f"book room {prefix}05"):
+                response = await client.post("/tasks/", json={"title": title}, headers=headers)
+                response.raise_for_status()
+            response = await client.get("/tasks/search", params={"q": prefix}, headers=headers)
+            response.raise_for_status()
+        await engine.dispose()
+        return prefix, [task["title"] for task in response.json()["items"]]
+
+    prefix, titles = asyncio.run(search())
+    assert titles == [f"book room {prefix}05"]